@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Shivering Ghosts - Shared Build Artifact Cache
+Every developer and CI runner builds the same sprites, post-processed AI
+sprites and audio encodes. Each pipeline stage is keyed by a hash of its
+inputs (stage code, parameters, tool versions, source bytes) and its
+outputs are stored as one tar blob under that key, so a clean checkout
+mostly downloads instead of rebuilding.
+
+Stores (pass a comma-separated list, pulled in order, pushed to all):
+    /path/to/dir            local directory (atomic writes, LRU eviction)
+    http://host:8765        simple HTTP store: GET/HEAD/PUT /<key>
+
+    python3 pipeline.py cache-server DIR     # local stand-in HTTP store
+
+Every stage declares the exact files it writes (relative to its output
+root); only those are packed and unpacked, nothing else under the root
+is ever touched.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import tarfile
+import tempfile
+import time
+
+CACHE_VERSION = 1                  # Bump to invalidate every key
+CACHE_MAX_MB = 2048                # Local store size bound (LRU eviction)
+STALE_TMP_SECONDS = 3600           # Leftovers from crashed writers
+HTTP_TIMEOUT = 30
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+MB = 1024 * 1024
+
+
+# --- Keys ---
+
+def package_versions(*names):
+    """Installed versions of packages whose behaviour shapes the output"""
+    from importlib import metadata
+
+    versions = {}
+    for name in names:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def stage_key(stage, code=(), params=None, sources=()):
+    """
+    sha256 over the stage name, its code files (relative to this script),
+    its JSON-serialisable params and the bytes of every source file.
+    Missing sources hash as missing, so adding one changes the key.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}|{stage}|".encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    for group, paths in (("code", [os.path.join(SCRIPT_DIR, p) for p in code]),
+                         ("source", list(sources))):
+        for path in sorted(paths):
+            h.update(f"|{group}:{os.path.basename(path)}:".encode())
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        h.update(block)
+            else:
+                h.update(b"<missing>")
+    return h.hexdigest()
+
+
+def source_files(root):
+    """Every file under a directory (e.g. a --replay dir), sorted"""
+    return sorted(os.path.join(d, f) for d, _, files in os.walk(root) for f in files)
+
+
+# --- Artifacts ---
+
+def pack(root, paths):
+    """Tar (uncompressed: PNG/AAC already are) the given relative paths"""
+    for rel in paths:
+        if os.path.isabs(rel) or ".." in rel.replace(os.sep, "/").split("/"):
+            raise ValueError(f"output {rel!r} is outside the stage root")
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for rel in paths:
+            info = tar.gettarinfo(os.path.join(root, rel), arcname=rel)
+            # Normalised metadata: identical outputs -> identical blobs
+            info.mtime, info.uid, info.gid, info.uname, info.gname = 0, 0, 0, "", ""
+            with open(os.path.join(root, rel), "rb") as f:
+                tar.addfile(info, f)
+    return buf.getvalue()
+
+
+def unpack(blob, root):
+    """Extract a blob under root; returns the file count. Rejects paths leaving root."""
+    with tarfile.open(fileobj=io.BytesIO(blob), mode="r") as tar:
+        members = tar.getmembers()
+        for m in members:
+            if not m.isfile() or os.path.isabs(m.name) or ".." in m.name.split("/"):
+                raise ValueError(f"unsafe cache entry {m.name!r}")
+        for m in members:
+            dest = os.path.join(root, m.name)
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            _atomic_write(dest, tar.extractfile(m).read())
+    return len(members)
+
+
+def _atomic_write(path, data):
+    """Write to a temp file in the same directory, then rename over path"""
+    folder = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+# --- Stores ---
+
+class LocalStore:
+    """
+    Directory of blobs sharded as <root>/<key[:2]>/<key>.
+    Writes are temp file + rename, so concurrent builders never see a
+    partial blob. Reads refresh the mtime; put() evicts least recently
+    used blobs until the store fits in max_bytes.
+    """
+
+    def __init__(self, root, max_bytes=CACHE_MAX_MB * MB):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def __repr__(self):
+        return self.root
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass    # Evicted by another process meanwhile; we have the bytes
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _atomic_write(path, data)
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used blobs (and stale temp files) past max_bytes"""
+        entries, total, now = [], 0, time.time()
+        for d, _, files in os.walk(self.root):
+            for f in files:
+                path = os.path.join(d, f)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if f.startswith(".tmp-"):
+                    if now - st.st_mtime > STALE_TMP_SECONDS:
+                        _remove(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass    # Another process evicted it first
+
+
+class HTTPStore:
+    """Plain HTTP store: GET/PUT <url>/<key> (404 = miss)"""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def __repr__(self):
+        return self.url
+
+    def get(self, key):
+        import urllib.error
+        import urllib.request
+
+        try:
+            with urllib.request.urlopen(f"{self.url}/{key}", timeout=HTTP_TIMEOUT) as r:
+                return r.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def put(self, key, data):
+        import urllib.request
+
+        req = urllib.request.Request(f"{self.url}/{key}", data=data, method="PUT",
+                                     headers={"Content-Type": "application/x-tar"})
+        with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT):
+            pass
+
+
+def open_stores(spec):
+    """'DIR,http://host:port' -> [LocalStore, HTTPStore]"""
+    stores = []
+    for item in filter(None, (s.strip() for s in (spec or "").split(","))):
+        if item.startswith(("http://", "https://")):
+            stores.append(HTTPStore(item))
+        else:
+            stores.append(LocalStore(item))
+    return stores
+
+
+# --- Stages ---
+
+def pull(stores, key):
+    """First hit wins and is copied into the stores before it. Returns (blob, store)."""
+    for i, store in enumerate(stores):
+        try:
+            blob = store.get(key)
+        except OSError as e:
+            print(f"   ⚠️ cache {store}: {e}")
+            continue
+        if blob is not None:
+            for earlier in stores[:i]:
+                _push_one(earlier, key, blob)
+            return blob, store
+    return None, None
+
+
+def _push_one(store, key, blob):
+    try:
+        store.put(key, blob)
+        return True
+    except OSError as e:
+        print(f"   ⚠️ cache {store}: {e}")
+        return False
+
+
+def run_stage(spec, stage, build, root, outputs, code=(), params=None, sources=()):
+    """
+    Pull-before-build / push-after-build around one pipeline stage.
+    `build()` returns an exit code (None = 0). `outputs` lists the files
+    it writes relative to `root`, or is a callable returning that list
+    after the build (e.g. when a manifest names them). Without a cache
+    spec this just runs build().
+    """
+    stores = open_stores(spec)
+    if not stores:
+        return build()
+
+    key = stage_key(stage, code, params, sources)
+    blob, store = pull(stores, key)
+    if blob is not None:
+        try:
+            count = unpack(blob, root)
+            print(f"📦 {stage}: cache hit {key[:12]} from {store} ({count} files)")
+            return 0
+        except (tarfile.TarError, ValueError) as e:
+            print(f"   ⚠️ cache entry {key[:12]} unusable ({e}), rebuilding")
+
+    print(f"📦 {stage}: cache miss {key[:12]}, building")
+    status = build() or 0
+    if status:
+        return status    # Never cache a failed build
+
+    outputs = sorted(set(outputs() if callable(outputs) else outputs))
+    missing = [p for p in outputs if not os.path.isfile(os.path.join(root, p))]
+    if missing:
+        print(f"   ⚠️ {stage}: {len(missing)} declared output(s) missing "
+              f"(e.g. {missing[0]}), not cached")
+        return 0
+    blob = pack(root, outputs)
+    pushed = sum(_push_one(store, key, blob) for store in stores)
+    print(f"📦 {stage}: pushed {len(outputs)} files ({len(blob) / MB:.1f} MB) "
+          f"to {pushed}/{len(stores)} store(s)")
+    return 0
+
+
+# --- Stand-in HTTP store ---
+
+def serve(root, host="127.0.0.1", port=8765, max_bytes=CACHE_MAX_MB * MB):
+    """Serve a LocalStore over HTTP (threaded; LocalStore makes writes atomic)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    store = LocalStore(root, max_bytes)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _key(self):
+            key = self.path.strip("/")
+            if not KEY_RE.match(key):
+                self.send_error(400, "bad key")
+                return None
+            return key
+
+        def do_GET(self):
+            key = self._key()
+            if key is None:
+                return
+            data = store.get(key)
+            if data is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-tar")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(data)
+
+        do_HEAD = do_GET
+
+        def do_PUT(self):
+            key = self._key()
+            if key is None:
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            if length > store.max_bytes:
+                self.send_error(413)
+                return
+            store.put(key, self.rfile.read(length))
+            self.send_response(201)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"📦 Serving artifact cache {root} on http://{host}:{server.server_port}")
+    return server
+
+
+def main(root, host="127.0.0.1", port=8765, max_mb=CACHE_MAX_MB):
+    server = serve(root, host, port, max_mb * MB)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main(*sys.argv[1:2]))
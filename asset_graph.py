@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Shivering Ghosts - Asset Operation Graph
+Tiny memoized DAG engine used by the sprite generators.
+
+A Node is one image operation (draw, glow, recolor, crop, resize,
+composite, encode). Its key is a hash of the operation, its parameters
+and the keys of its inputs, so two nodes built the same way are the same
+node: shared subgraphs (e.g. the dead ghost under every dead variant) are
+evaluated once per build. Independent branches run on a thread pool
+(PIL releases the GIL for resize, blur and PNG encoding).
+
+Node functions must NOT mutate their input images; results are shared.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Node:
+    """One operation: fn(*input_results, *params)"""
+    __slots__ = ("op", "fn", "inputs", "params", "key")
+
+    def __init__(self, op, fn, inputs=(), params=()):
+        self.op = op
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.params = tuple(params)
+
+        h = hashlib.sha1()
+        h.update(f"{op}|{fn.__module__}.{fn.__qualname__}|{self.params!r}".encode())
+        for dep in self.inputs:
+            h.update(dep.key.encode())
+        self.key = h.hexdigest()
+
+    def __repr__(self):
+        return f"<Node {self.op}:{self.fn.__qualname__} {self.key[:8]}>"
+
+
+def node(op, fn, inputs=(), *params):
+    """Build a node; `params` must have a stable repr (numbers, str, tuples)"""
+    return Node(op, fn, inputs, params)
+
+
+# --- Generic image operations ---
+
+def _crop(img, bbox=None):
+    """Crop to bbox, or to the alpha bounds when bbox is None"""
+    bbox = bbox or img.getbbox()
+    return img.crop(bbox) if bbox else img
+
+def _resize(img, factor):
+    """Resize by factor (same int() rounding as save_sprite)"""
+    from PIL import Image
+    size = (int(img.width * factor), int(img.height * factor))
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+def _composite(*layers):
+    """Alpha-composite layers bottom to top onto a copy of the first"""
+    out = layers[0].copy()
+    for layer in layers[1:]:
+        out.alpha_composite(layer)
+    return out
+
+def _encode(img, path):
+    """Write a PNG, returns its path"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    img.save(path)
+    return path
+
+def crop(src, bbox=None):
+    return Node("crop", _crop, [src], [tuple(bbox) if bbox else None])
+
+def resize(src, factor):
+    return Node("resize", _resize, [src], [factor])
+
+def composite(*layers):
+    return Node("composite", _composite, layers)
+
+def encode(src, path):
+    return Node("encode", _encode, [src], [path])
+
+
+# --- Evaluation ---
+
+class Build:
+    """
+    Evaluates graphs, memoizing every node result by key for the lifetime
+    of the build. `workers=1` evaluates serially (handy for debugging).
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.cache = {}
+        self.evaluated = 0
+        self.reused = 0
+
+    def _collect(self, targets):
+        """Unique nodes reachable from targets, dependencies first"""
+        order, seen = [], set()
+        stack = [(n, False) for n in reversed(targets)]
+        while stack:
+            n, expanded = stack.pop()
+            if expanded:
+                order.append(n)
+                continue
+            if n.key in seen or n.key in self.cache:
+                # Shared subgraph: evaluated (or scheduled) once
+                self.reused += 1
+                continue
+            seen.add(n.key)
+            stack.append((n, True))
+            stack.extend((dep, False) for dep in reversed(n.inputs))
+        return order
+
+    def _run(self, n):
+        return n.fn(*(self.cache[dep.key] for dep in n.inputs), *n.params)
+
+    def run(self, targets):
+        """Evaluate target nodes; returns their results in order"""
+        pending = self._collect(targets)
+
+        if self.workers == 1:
+            for n in pending:
+                self.cache[n.key] = self._run(n)
+                self.evaluated += 1
+            return [self.cache[t.key] for t in targets]
+
+        waiting = {n.key: n for n in pending}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while waiting or running:
+                # Submit every node whose inputs are all done
+                for key, n in list(waiting.items()):
+                    if all(dep.key in self.cache for dep in n.inputs):
+                        running[pool.submit(self._run, n)] = n
+                        del waiting[key]
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n = running.pop(future)
+                    self.cache[n.key] = future.result()
+                    self.evaluated += 1
+
+        return [self.cache[t.key] for t in targets]
@@ -1,8 +1,38 @@
 import os
+import json
 import subprocess
+import tempfile
+import wave
+
+AUDIO_DIR = "Shivering Ghosts"
+
+# --- SFX Sprite ---
+# Short effects played in rapid succession are packed into ONE file:
+# one file open + one decoder on device instead of eight.
+SFX_NAMES = ["pop", "correct_match", "wrong_match", "shiver",
+             "ghost_happy", "timeout", "freeze_death", "yarn_drag"]
+SPRITE_NAME = "sfx_sprite"
+SPRITE_RATE = 44100     # Hz
+SPRITE_CHANNELS = 1     # SFX are mono
+SPRITE_BITRATE = 48000  # Same as single SFX encodes
+GUARD_SECONDS = 0.1     # Silence between segments (absorbs AAC frame bleed)
+
+# --- Seamless Loops ---
+# Long looping tracks are cut where their tail lines up with their head,
+# so jumping back to sample 0 is click-free, and the AAC priming/padding
+# is recorded so the player can schedule the loop sample-accurately.
+LOOP_NAMES = ["game_music", "wind_ambience"]
+LOOP_RATE = 44100
+LOOP_MATCH_SECONDS = 0.25    # Head window the loop point must continue into
+LOOP_SEARCH_SECONDS = 4.0    # How far before the end the loop point may move
+LOOP_MIN_CORRELATION = 0.8   # Below this the track is kept at full length
+LOOP_TIE_EPSILON = 1e-3      # Peaks this close to the best count as ties (latest wins)
+LOOP_BLOCK_FRAMES = 65536    # Frames per read (bounds peak memory)
+AAC_FRAME = 1024             # Samples per AAC packet
+AAC_PRIMING = 2112           # Encoder delay of Apple's AAC encoder (samples)
 
 def convert_mp3_to_m4a():
-    root_dir = "Shivering Ghosts"
+    root_dir = AUDIO_DIR
     for root, dirs, files in os.walk(root_dir):
         for file in files:
             if file.endswith(".mp3"):
@@ -34,5 +64,348 @@ def convert_mp3_to_m4a():
                 else:
                     print(f"❌ Failed: {result.stderr}")
 
+def decode_to_wav(path, wav_path, sample_rate=SPRITE_RATE, channels=SPRITE_CHANNELS):
+    """Decode any afconvert-readable file to a 16-bit WAV (channels=None keeps the source's)"""
+    cmd = [
+        "afconvert",
+        "-f", "WAVE",
+        "-d", f"LEI16@{sample_rate}",
+        path,
+        wav_path
+    ]
+    if channels:
+        cmd[5:5] = ["-c", str(channels)]
+    subprocess.run(cmd, capture_output=True, text=True, check=True)
+
+def decode_to_pcm(path, sample_rate=SPRITE_RATE, channels=SPRITE_CHANNELS):
+    """Decode any afconvert-readable file to 16-bit little-endian PCM bytes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        wav_path = os.path.join(tmp, "decoded.wav")
+        decode_to_wav(path, wav_path, sample_rate, channels)
+        with wave.open(wav_path, "rb") as w:
+            return w.readframes(w.getnframes())
+
+def encode_aac(wav_path, m4a_path, bitrate):
+    """Encode a WAV to AAC in an .m4a; returns True on success"""
+    cmd = [
+        "afconvert",
+        "-f", "m4af",
+        "-d", "aac",
+        "-b", str(bitrate),
+        wav_path,
+        m4a_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"❌ Failed: {result.stderr}")
+        return False
+    return True
+
+def pack_pcm(segments, sample_rate=SPRITE_RATE, channels=SPRITE_CHANNELS, guard=GUARD_SECONDS):
+    """
+    Concatenate PCM segments ({name: bytes}) with guard silence before,
+    between and after them. Returns (pcm, table) where table maps
+    name -> {"start", "duration"} in seconds plus exact sample offsets.
+    """
+    frame_bytes = 2 * channels
+    guard_frames = int(round(guard * sample_rate))
+    silence = b"\x00" * (guard_frames * frame_bytes)
+    
+    chunks = [silence]
+    table = {}
+    cursor = guard_frames
+    for name, pcm in segments.items():
+        frames = len(pcm) // frame_bytes
+        table[name] = {
+            "start": round(cursor / sample_rate, 6),
+            "duration": round(frames / sample_rate, 6),
+            "start_sample": cursor,
+            "samples": frames,
+        }
+        chunks += [pcm[:frames * frame_bytes], silence]
+        cursor += frames + guard_frames
+    return b"".join(chunks), table
+
+def write_wav(path, pcm, sample_rate=SPRITE_RATE, channels=SPRITE_CHANNELS):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm)
+
+def verify_sprite(sprite_path, segments, table, min_correlation=0.9):
+    """
+    Round-trip check: decode the encoded sprite and compare every segment
+    with its source PCM (normalized cross-correlation, small lag search for
+    encoder delay). Returns True when every segment matches.
+    """
+    import numpy as np
+    
+    decoded = np.frombuffer(decode_to_pcm(sprite_path), dtype="<i2").astype(np.float64)
+    guard = int(round(GUARD_SECONDS * SPRITE_RATE))
+    ok = True
+    for name, pcm in segments.items():
+        src = np.frombuffer(pcm, dtype="<i2").astype(np.float64)
+        entry = table[name]
+        # Window = segment +/- guard, so any encoder delay is still covered
+        lo = max(0, entry["start_sample"] - guard)
+        window = decoded[lo:entry["start_sample"] + entry["samples"] + guard]
+        if not len(src) or len(window) < len(src):
+            print(f"   ❌ {name}: segment missing from sprite")
+            ok = False
+            continue
+        
+        # Cross-correlation over all lags via FFT
+        n = len(window) + len(src)
+        corr = np.fft.irfft(np.fft.rfft(window, n) * np.conj(np.fft.rfft(src, n)), n)
+        lag = int(np.argmax(corr[:len(window) - len(src) + 1]))
+        seg = window[lag:lag + len(src)]
+        denom = np.linalg.norm(seg) * np.linalg.norm(src)
+        score = float(np.dot(seg, src) / denom) if denom else 1.0
+        offset = lo + lag - entry["start_sample"]
+        mark = "✅" if score >= min_correlation else "❌"
+        print(f"   {mark} {name}: correlation {score:.3f}, offset {offset} samples")
+        ok = ok and score >= min_correlation
+    return ok
+
+def find_source(name, root_dir=AUDIO_DIR):
+    """Prefer the original .mp3 (lossless-er source), fall back to .m4a"""
+    for ext in (".mp3", ".wav", ".m4a"):
+        path = os.path.join(root_dir, name + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+def build_sfx_sprite(root_dir=AUDIO_DIR, verify=False):
+    """Decode the short SFX, pack them into one PCM stream and encode it once"""
+    print("🔊 Packing SFX sprite...")
+    
+    segments = {}
+    for name in SFX_NAMES:
+        path = find_source(name, root_dir)
+        if not path:
+            print(f"❌ Missing source for {name}")
+            return 1
+        segments[name] = decode_to_pcm(path)
+    
+    pcm, table = pack_pcm(segments)
+    sprite_path = os.path.join(root_dir, f"{SPRITE_NAME}.m4a")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        wav_path = os.path.join(tmp, f"{SPRITE_NAME}.wav")
+        write_wav(wav_path, pcm)
+        if not encode_aac(wav_path, sprite_path, SPRITE_BITRATE):
+            return 1
+    
+    sprite_table = {
+        "file": f"{SPRITE_NAME}.m4a",
+        "sample_rate": SPRITE_RATE,
+        "channels": SPRITE_CHANNELS,
+        "guard": GUARD_SECONDS,
+        "sprites": table,
+    }
+    with open(os.path.join(root_dir, f"{SPRITE_NAME}.json"), "w") as f:
+        json.dump(sprite_table, f, indent=2)
+    print(f"✅ {sprite_path}: {len(table)} sounds, {len(pcm) / (2 * SPRITE_CHANNELS * SPRITE_RATE):.2f}s")
+    
+    if verify and not verify_sprite(sprite_path, segments, table):
+        return 1
+    return 0
+
+def bitrate_for(name):
+    """48kbps is sufficient for casual SFX, 64kbps for music"""
+    return 64000 if "music" in name.lower() else 48000
+
+def aac_padding(samples, priming=AAC_PRIMING):
+    """Silent samples the encoder appends to fill the last AAC packet"""
+    return -(samples + priming) % AAC_FRAME
+
+def _mono(frames, channels):
+    import numpy as np
+    pcm = np.frombuffer(frames, dtype="<i2").astype(np.float64)
+    return pcm.reshape(-1, channels).mean(axis=1)
+
+def _ncc(a, b):
+    """Normalized cross-correlation of two equal-length windows"""
+    import numpy as np
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(np.dot(a, b) / norm) if norm else 0.0
+
+def find_loop_point(wav_path, match=LOOP_MATCH_SECONDS, search=LOOP_SEARCH_SECONDS,
+                    block=LOOP_BLOCK_FRAMES):
+    """
+    Find the loop end E where x[E:E+m] best matches the head x[0:m]
+    (normalized cross-correlation), so playing [0, E) and jumping back to 0
+    continues the same waveform. The search region near the end is streamed
+    in blocks (FFT correlation per block, m-1 frames carried over), so memory
+    stays constant however long the track is. Returns (E, correlation).
+    
+    Repetitive music matches the head at every bar, so among correlation
+    peaks within LOOP_TIE_EPSILON of the best the latest wins (the result
+    does not depend on the block size). E = total is scored too: the track
+    already wraps cleanly when its last m frames match the m frames before
+    the best cut, since both are then followed by the head.
+    """
+    import numpy as np
+    
+    with wave.open(wav_path, "rb") as w:
+        rate, channels, total = w.getframerate(), w.getnchannels(), w.getnframes()
+        m = int(match * rate)
+        first = max(m, total - m - int(search * rate))
+        if total - m < first:
+            return total, 0.0    # Too short to search
+        
+        head = _mono(w.readframes(m), channels)
+        head_norm = np.linalg.norm(head)
+        if not head_norm:
+            return total, 0.0    # Silent head: any cut is as good as the end
+        
+        best, best_score, top = total, -1.0, -1.0
+        w.setpos(first)
+        carry = np.zeros(0)
+        buf_start = first
+        # Scores whose right neighbour is still unknown (peaks need both);
+        # -inf stands in for the position before the search region
+        pending, pending_start = np.array([-np.inf]), first - 1
+        remaining = total - first
+        while remaining > 0:
+            frames = w.readframes(min(block, remaining))
+            remaining -= len(frames) // (2 * channels)
+            buf = np.concatenate([carry, _mono(frames, channels)])
+            if len(buf) < m:
+                carry = buf
+                continue
+            # dot(x[p:p+m], head) for every p, and the window energies
+            n = len(buf) + m
+            dots = np.fft.irfft(np.fft.rfft(buf, n) * np.conj(np.fft.rfft(head, n)), n)
+            energy = np.concatenate([[0.0], np.cumsum(buf * buf)])
+            count = len(buf) - m + 1
+            norms = np.sqrt(np.maximum(energy[m:m + count] - energy[:count], 0)) * head_norm
+            scores = np.divide(dots[:count], norms, out=np.zeros(count), where=norms > 0)
+            carry = buf[count:]
+            buf_start += count
+            if remaining <= 0:
+                scores = np.append(scores, -np.inf)    # Right edge of the region
+            
+            s = np.concatenate([pending, scores])
+            mid = s[1:-1]
+            peaks = np.flatnonzero((mid >= s[:-2]) & (mid >= s[2:])) + 1
+            if len(peaks):
+                top = max(top, float(s[peaks].max()))
+                ties = peaks[s[peaks] >= top - LOOP_TIE_EPSILON]
+                if len(ties):
+                    best, best_score = pending_start + int(ties[-1]), float(s[ties[-1]])
+            pending_start += len(s) - 2
+            pending = s[-2:]
+        
+        if best_score >= LOOP_MIN_CORRELATION and best < total:
+            # Wrap-around at the end: the cut at `best` continues into the head,
+            # so the end does too when the frames leading up to both match
+            w.setpos(best - m)
+            before_cut = _mono(w.readframes(m), channels)
+            w.setpos(total - m)
+            before_end = _mono(w.readframes(m), channels)
+            wrap = min(best_score, _ncc(before_end, before_cut))
+            if wrap >= top - LOOP_TIE_EPSILON:
+                best, best_score = total, wrap
+    
+    if best_score < LOOP_MIN_CORRELATION:
+        return total, best_score
+    return best, best_score
+
+def _copy_frames(src, dst_path, start, count, block=LOOP_BLOCK_FRAMES):
+    """Stream `count` frames from an open wave reader into a new WAV"""
+    src.setpos(start)
+    with wave.open(dst_path, "wb") as dst:
+        dst.setparams(src.getparams())
+        while count > 0:
+            n = min(block, count)
+            dst.writeframes(src.readframes(n))
+            count -= n
+
+def build_loop(name, root_dir=AUDIO_DIR, chunk_seconds=None):
+    """
+    Trim one looping track to its best loop point and encode it as
+    <name>_loop.m4a (or <name>_loop_NNN.m4a chunks of chunk_seconds each),
+    plus <name>_loop.json with the loop/priming/padding metadata.
+    """
+    if chunk_seconds is not None and int(chunk_seconds * LOOP_RATE) < 1:
+        raise ValueError(f"chunk_seconds {chunk_seconds} is shorter than one sample")
+    
+    path = find_source(name, root_dir)
+    if not path:
+        print(f"❌ Missing source for {name}")
+        return 1
+    
+    bitrate = bitrate_for(name)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Decoded to disk, then only ever read in blocks
+        wav_path = os.path.join(tmp, "decoded.wav")
+        decode_to_wav(path, wav_path, LOOP_RATE, None)
+        end, score = find_loop_point(wav_path)
+        
+        with wave.open(wav_path, "rb") as w:
+            rate, channels, total = w.getframerate(), w.getnchannels(), w.getnframes()
+            step = int(chunk_seconds * rate) if chunk_seconds else end
+            chunks = []
+            for index, start in enumerate(range(0, end, step)):
+                samples = min(step, end - start)
+                suffix = f"_{index:03d}" if chunk_seconds else ""
+                filename = f"{name}_loop{suffix}.m4a"
+                # One chunk on disk at a time
+                chunk_wav = os.path.join(tmp, "chunk.wav")
+                _copy_frames(w, chunk_wav, start, samples)
+                if not encode_aac(chunk_wav, os.path.join(root_dir, filename), bitrate):
+                    return 1
+                os.remove(chunk_wav)
+                chunks.append({
+                    "file": filename,
+                    "start_sample": start,
+                    "samples": samples,
+                    "priming": AAC_PRIMING,
+                    "padding": aac_padding(samples),
+                })
+    
+    loop_info = {
+        "sample_rate": rate,
+        "channels": channels,
+        "source_samples": total,
+        "loop_start_sample": 0,
+        "loop_end_sample": end,
+        "loop_duration": round(end / rate, 6),
+        "correlation": round(score, 4),
+        "chunk_seconds": chunk_seconds,
+        "chunks": chunks,
+    }
+    with open(os.path.join(root_dir, f"{name}_loop.json"), "w") as f:
+        json.dump(loop_info, f, indent=2)
+    
+    trimmed = (total - end) / rate
+    mark = "✅" if end < total else "⚠️ "
+    print(f"{mark} {name}: loop {end / rate:.3f}s (trimmed {trimmed:.3f}s, "
+          f"correlation {score:.3f}), {len(chunks)} file(s)")
+    return 0
+
+def sfx_sprite_outputs():
+    """Files build_sfx_sprite() writes, relative to AUDIO_DIR"""
+    return [f"{SPRITE_NAME}.m4a", f"{SPRITE_NAME}.json"]
+
+def loop_outputs(root_dir=AUDIO_DIR):
+    """Files the last build_loops() wrote (chunk files come from each <name>_loop.json)"""
+    outputs = []
+    for name in LOOP_NAMES:
+        with open(os.path.join(root_dir, f"{name}_loop.json")) as f:
+            outputs += [chunk["file"] for chunk in json.load(f)["chunks"]]
+        outputs.append(f"{name}_loop.json")
+    return outputs
+
+def build_loops(root_dir=AUDIO_DIR, chunk_seconds=None):
+    """Loop-analyse and encode every long looping track"""
+    print("🔁 Building seamless loops...")
+    for name in LOOP_NAMES:
+        if build_loop(name, root_dir, chunk_seconds):
+            return 1
+    return 0
+
 if __name__ == "__main__":
     convert_mp3_to_m4a()
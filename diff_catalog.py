@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Shivering Ghosts - Golden Image Diff
+Compares two asset catalogs (e.g. a golden copy vs. a fresh build) image by
+image, so speed-ups to add_glow / save_sprite / remove_background can be
+checked for pixel changes across the whole catalog in one go.
+
+For every imageset and scale it reports:
+  - max / mean absolute error (premultiplied RGBA, 0-255)
+  - changed pixel count (any channel differs)
+  - SSIM (mean over premultiplied RGBA channels, 7x7 windows)
+  - alpha-only max / mean error
+Failures get a heat-map PNG and make the run exit non-zero.
+
+Errors are measured on premultiplied colour, so colour hidden under fully
+transparent pixels (e.g. remove_background's (255, 255, 255, 0)) is ignored.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Default regression-gate thresholds (strict: golden images should match)
+MAX_ERROR = 0          # Worst single channel difference allowed
+MEAN_ERROR = 0.0       # Mean absolute difference allowed
+MIN_SSIM = 1.0         # Lowest SSIM allowed
+MAX_CHANGED = 0.0      # Fraction of pixels allowed to change
+
+SSIM_WINDOW = 7
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+
+
+def list_images(catalog_dir):
+    """
+    Map "<imageset>/<scale>" -> png path for every imageset in a catalog.
+    Scale comes from Contents.json ("universal" when it has none).
+    """
+    images = {}
+    for root, dirs, files in os.walk(catalog_dir):
+        if not root.endswith(".imageset") or "Contents.json" not in files:
+            continue
+        rel = os.path.relpath(root, catalog_dir)
+        with open(os.path.join(root, "Contents.json")) as f:
+            contents = json.load(f)
+        for entry in contents.get("images", []):
+            filename = entry.get("filename")
+            if filename:
+                scale = entry.get("scale", "universal")
+                images[f"{rel}/{scale}"] = os.path.join(root, filename)
+    return images
+
+
+def _load(path):
+    """Load an image as a premultiplied float RGBA array"""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as img:
+        arr = np.asarray(img.convert("RGBA"), dtype=np.float64)
+    arr[..., :3] *= arr[..., 3:4] / 255.0
+    return arr
+
+
+def _box_mean(x, k):
+    """Mean over every k x k window (valid region) using integral images"""
+    import numpy as np
+
+    s = np.pad(x, ((1, 0), (1, 0)) + ((0, 0),) * (x.ndim - 2)).cumsum(0).cumsum(1)
+    return (s[k:, k:] - s[:-k, k:] - s[k:, :-k] + s[:-k, :-k]) / (k * k)
+
+
+def _ssim_map(a, b, k):
+    mu_a, mu_b = _box_mean(a, k), _box_mean(b, k)
+    var_a = _box_mean(a * a, k) - mu_a ** 2
+    var_b = _box_mean(b * b, k) - mu_b ** 2
+    cov = _box_mean(a * b, k) - mu_a * mu_b
+    num = (2 * mu_a * mu_b + _SSIM_C1) * (2 * cov + _SSIM_C2)
+    den = (mu_a ** 2 + mu_b ** 2 + _SSIM_C1) * (var_a + var_b + _SSIM_C2)
+    return num / den
+
+
+def ssim(a, b, changed=None, window=SSIM_WINDOW):
+    """
+    Mean SSIM of two same-sized HxWxC float arrays (all channels).
+    `changed` (HxW bool) lets us evaluate only windows touching changed
+    pixels: every other window compares identical data and scores exactly 1.
+    """
+    import numpy as np
+
+    # Images smaller than one window fall back to a single global window
+    h, w = a.shape[:2]
+    k = min(window, h, w)
+    if changed is None:
+        return float(np.mean(_ssim_map(a, b, k)))
+
+    rows = np.flatnonzero(changed.any(axis=1))
+    cols = np.flatnonzero(changed.any(axis=0))
+    if not rows.size:
+        return 1.0
+    # Crop to every window that overlaps the changed bounding box
+    y0, y1 = max(0, rows[0] - k + 1), min(h, rows[-1] + k)
+    x0, x1 = max(0, cols[0] - k + 1), min(w, cols[-1] + k)
+    local = _ssim_map(a[y0:y1, x0:x1], b[y0:y1, x0:x1], k)
+
+    channels = a.shape[2] if a.ndim == 3 else 1
+    total = (h - k + 1) * (w - k + 1) * channels
+    return float((local.sum() + (total - local.size)) / total)
+
+
+def compare_images(path_a, path_b):
+    """Compare two image files. Returns a metrics dict (and the diff map)"""
+    import numpy as np
+
+    a, b = _load(path_a), _load(path_b)
+    if a.shape == b.shape and np.array_equal(a, b):
+        # Fast path: the common case for a regression gate
+        return {
+            "status": "ok",
+            "size": [a.shape[1], a.shape[0]],
+            "max_error": 0.0,
+            "mean_error": 0.0,
+            "changed_pixels": 0,
+            "changed_fraction": 0.0,
+            "ssim": 1.0,
+            "alpha_max_error": 0.0,
+            "alpha_mean_error": 0.0,
+        }, None
+    if a.shape != b.shape:
+        return {
+            "status": "size",
+            "size_a": [a.shape[1], a.shape[0]],
+            "size_b": [b.shape[1], b.shape[0]],
+        }, None
+
+    diff = np.abs(a - b)
+    per_pixel = diff.max(axis=2)
+    return {
+        "status": "ok",
+        "size": [a.shape[1], a.shape[0]],
+        "max_error": float(per_pixel.max()),
+        "mean_error": float(diff.mean()),
+        "changed_pixels": int(np.count_nonzero(per_pixel)),
+        "changed_fraction": float(np.count_nonzero(per_pixel) / per_pixel.size),
+        "ssim": ssim(a, b, per_pixel > 0),
+        "alpha_max_error": float(diff[..., 3].max()),
+        "alpha_mean_error": float(diff[..., 3].mean()),
+    }, per_pixel
+
+
+def save_heatmap(per_pixel, path):
+    """Write a heat map: black = identical, red -> yellow = larger error"""
+    import numpy as np
+    from PIL import Image
+
+    peak = per_pixel.max() or 1.0
+    norm = per_pixel / peak
+    heat = np.zeros(per_pixel.shape + (3,), dtype=np.uint8)
+    heat[..., 0] = np.where(per_pixel > 0, 64 + 191 * np.minimum(norm * 2, 1), 0)
+    heat[..., 1] = 255 * np.clip(norm * 2 - 1, 0, 1)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.fromarray(heat, "RGB").save(path)
+
+
+def passes(metrics, max_error=MAX_ERROR, mean_error=MEAN_ERROR,
+           min_ssim=MIN_SSIM, max_changed=MAX_CHANGED):
+    """Check a metrics dict against the regression-gate thresholds"""
+    return (metrics["status"] == "ok"
+            and metrics["max_error"] <= max_error
+            and metrics["mean_error"] <= mean_error
+            and metrics["ssim"] >= min_ssim
+            and metrics["changed_fraction"] <= max_changed)
+
+
+def _diff_one(job):
+    """Worker: compare one (key, path_a, path_b) and write a heat map on failure"""
+    key, path_a, path_b, thresholds, heatmap_dir = job
+    metrics, per_pixel = compare_images(path_a, path_b)
+    metrics["key"] = key
+    metrics["passed"] = passes(metrics, **thresholds)
+    if not metrics["passed"] and per_pixel is not None and heatmap_dir:
+        heat_path = os.path.join(heatmap_dir, key.replace("/", "_") + "_heat.png")
+        save_heatmap(per_pixel, heat_path)
+        metrics["heatmap"] = heat_path
+    return metrics
+
+
+def diff_catalogs(golden_dir, build_dir, heatmap_dir=None, workers=None, **thresholds):
+    """
+    Diff every image of two catalogs in parallel.
+    Returns a list of metrics dicts sorted by key. Images that only exist on
+    one side are reported with status "missing" and always fail.
+    """
+    golden = list_images(golden_dir)
+    build = list_images(build_dir)
+
+    results = []
+    for key in sorted(set(golden) ^ set(build)):
+        results.append({
+            "key": key,
+            "status": "missing",
+            "missing_from": "build" if key in golden else "golden",
+            "passed": False,
+        })
+
+    jobs = [(key, golden[key], build[key], thresholds, heatmap_dir)
+            for key in sorted(set(golden) & set(build))]
+    if workers == 1:
+        results.extend(map(_diff_one, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results.extend(pool.map(_diff_one, jobs, chunksize=4))
+
+    return sorted(results, key=lambda r: r["key"])
+
+
+def print_report(results):
+    """Print one line per failing image plus a summary"""
+    failed = [r for r in results if not r["passed"]]
+    for r in failed:
+        if r["status"] == "missing":
+            print(f"❌ {r['key']}: missing from {r['missing_from']}")
+        elif r["status"] == "size":
+            print(f"❌ {r['key']}: size {r['size_a']} -> {r['size_b']}")
+        else:
+            print(f"❌ {r['key']}: max={r['max_error']:.0f} mean={r['mean_error']:.3f} "
+                  f"changed={r['changed_pixels']} ssim={r['ssim']:.4f} "
+                  f"alpha max={r['alpha_max_error']:.0f} mean={r['alpha_mean_error']:.3f}")
+    print(f"{'✅' if not failed else '❌'} {len(results) - len(failed)}/{len(results)} images match")
+    return not failed
+
+
+def main(golden_dir, build_dir, heatmap_dir=None, report=None, workers=None, **thresholds):
+    results = diff_catalogs(golden_dir, build_dir, heatmap_dir, workers, **thresholds)
+    if report:
+        with open(report, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0 if print_report(results) else 1
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main(*sys.argv[1:3]))
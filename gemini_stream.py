@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Shivering Ghosts - Streaming Gemini Response Reader
+Reads a generateContent response incrementally instead of
+response.json() -> b64decode -> full-size decode -> resize.
+
+- The JSON is scanned chunk by chunk. Every inlineData "data" string is
+  base64-decoded straight into a buffer as it arrives; the rest of the
+  JSON (text parts, mimeTypes) is kept as a tiny skeleton.
+- Each image is decoded as soon as its string closes, using draft mode
+  (JPEG DCT scaling) and an integer reduce() before the final LANCZOS
+  resample, then its raw bytes are dropped.
+
+Peak memory per request is one raw payload plus the pixel buffers of the
+decode chain (at PIL's in-memory size, every intermediate counted). It
+is checked against a budget before decoding, so many generations fit in
+a small worker.
+"""
+
+import base64
+import codecs
+import json
+from io import BytesIO
+
+STREAM_CHUNK = 64 * 1024               # Bytes read per network chunk
+MEMORY_LIMIT = 64 * 1024 * 1024        # Per-request budget (bytes)
+TARGET_SIZE = (300, 400)               # Game asset size
+
+
+class InlineDataParser:
+    """
+    Incremental scanner for a Gemini JSON response.
+    feed() raw bytes; every "data" string value is streamed as decoded
+    bytes through the on_data_* callbacks and replaced by "@<index>" in
+    the skeleton.
+    """
+
+    def __init__(self, on_data_start, on_data_chunk, on_data_end):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._skeleton = []
+        self._in_string = False
+        self._escape = False
+        self._string = []          # Current string token (outside data)
+        self._last_string = None   # Last completed string (candidate key)
+        self._await_value = False  # Saw "data": and waiting for the value
+        self._in_data = False
+        self._b64_tail = ""        # Base64 chars not yet 4-aligned
+        self._count = 0
+        self._on_start = on_data_start
+        self._on_chunk = on_data_chunk
+        self._on_end = on_data_end
+
+    def feed(self, raw):
+        text = self._decoder.decode(raw)
+        i, n = 0, len(text)
+        while i < n:
+            if self._in_data:
+                end = text.find('"', i)
+                piece = text[i:] if end == -1 else text[i:end]
+                self._feed_b64(piece.replace("\\", ""))
+                if end == -1:
+                    return
+                self._finish_data()
+                i = end
+                continue
+            i = self._scan(text, i)
+
+    def _scan(self, text, i):
+        """Scan skeleton characters until a data string starts; returns index"""
+        out = self._skeleton
+        n = len(text)
+        while i < n:
+            c = text[i]
+            if self._in_string:
+                out.append(c)
+                if self._escape:
+                    self._escape = False
+                    self._string.append(c)
+                elif c == "\\":
+                    self._escape = True
+                    self._string.append(c)
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string)
+                    self._string = []
+                else:
+                    self._string.append(c)
+            elif c == '"':
+                if self._await_value:
+                    # Value of a "data" key: stream it instead of buffering
+                    self._await_value = False
+                    out.append(f'"@{self._count}')
+                    self._in_data = True
+                    self._on_start(self._count)
+                    return i + 1
+                self._in_string = True
+                out.append(c)
+            elif c == ":":
+                self._await_value = self._last_string == "data"
+                out.append(c)
+            else:
+                if not c.isspace():
+                    self._await_value = False
+                    self._last_string = None
+                out.append(c)
+            i += 1
+        return i
+
+    def _feed_b64(self, piece):
+        piece = self._b64_tail + piece
+        cut = len(piece) - len(piece) % 4
+        self._b64_tail = piece[cut:]
+        if cut:
+            self._on_chunk(base64.b64decode(piece[:cut]))
+
+    def _finish_data(self):
+        if self._b64_tail:
+            self._on_chunk(base64.b64decode(self._b64_tail + "=" * (-len(self._b64_tail) % 4)))
+            self._b64_tail = ""
+        self._in_data = False
+        self._last_string = None
+        self._on_end(self._count)
+        self._count += 1
+        # Closing quote of the data string is emitted by the caller's scan
+        self._in_string = True
+
+    def close(self):
+        """Return the parsed skeleton (data values replaced by "@<index>")"""
+        return json.loads("".join(self._skeleton))
+
+
+def _pixel_bytes(mode):
+    """Bytes per pixel PIL allocates for a mode (RGB is stored as 4)"""
+    if mode in ("1", "L", "P"):
+        return 1
+    if mode.startswith("I;16"):
+        return 2
+    return 4
+
+
+def decode_draft(buf, size=TARGET_SIZE, limit=MEMORY_LIMIT):
+    """
+    Decode an encoded image close to `size` with as little memory as the
+    format allows, then LANCZOS to exactly `size` (RGBA).
+    Returns (image, decoded_bytes) where decoded_bytes bounds the pixel
+    buffers of the decode chain, counted as if every intermediate
+    (decode, reduce, RGBA, LANCZOS passes) were alive at once.
+    """
+    from PIL import Image
+
+    img = Image.open(buf)
+    # JPEG: decode straight at 1/2..1/8 scale (no-op for PNG)
+    img.draft("RGB", (size[0] * 2, size[1] * 2))
+
+    # Integer box reduce to ~2x target keeps LANCZOS cheap and the result sharp
+    factor = min(img.width // (size[0] * 2), img.height // (size[1] * 2))
+
+    # Plan the buffers before anything is decoded
+    w, h = img.size
+    buffers = [w * h * _pixel_bytes(img.mode)]
+    if factor > 1:
+        w, h = -(-w // factor), -(-h // factor)
+        buffers.append(w * h * _pixel_bytes(img.mode))
+    if img.mode != "RGBA":
+        buffers.append(w * h * 4)
+    # resize() premultiplies into an RGBa copy, resamples horizontally then
+    # vertically, and converts the result back to RGBA
+    buffers += [w * h * 4, size[0] * h * 4, size[0] * size[1] * 4 * 2]
+    decoded = sum(buffers)
+    if decoded > limit:
+        raise MemoryError(f"image {img.width}x{img.height} needs {decoded} bytes (> {limit})")
+
+    if factor > 1:
+        img = img.reduce(factor)
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    return img.resize(size, Image.LANCZOS), decoded
+
+
+def read_candidates(chunks, size=TARGET_SIZE, limit=MEMORY_LIMIT):
+    """
+    Stream a response (iterable of byte chunks) and decode its images.
+    Returns (result, images, stats):
+      result: response JSON with every inlineData "data" as "@<index>"
+      images: {index: 300x400 RGBA image}
+      stats:  peak_bytes / payload_bytes / decoded_bytes estimates
+    Raises MemoryError as soon as the budget would be exceeded.
+    """
+    images = {}
+    stats = {"peak_bytes": 0, "payload_bytes": 0, "decoded_bytes": 0}
+    state = {"buf": None, "chunk": 0}
+
+    def track(current):
+        stats["peak_bytes"] = max(stats["peak_bytes"], current)
+        if current > limit:
+            raise MemoryError(f"response needs {current} bytes (> {limit})")
+
+    def on_start(index):
+        state["buf"] = BytesIO()
+
+    def on_chunk(data):
+        state["buf"].write(data)
+        track(state["buf"].tell() + state["chunk"])
+
+    def on_end(index):
+        buf = state["buf"]
+        payload = buf.tell()
+        stats["payload_bytes"] = max(stats["payload_bytes"], payload)
+        buf.seek(0)
+        image, decoded = decode_draft(buf, size, limit - payload)
+        stats["decoded_bytes"] = max(stats["decoded_bytes"], decoded)
+        track(payload + decoded)
+        images[index] = image
+        state["buf"] = None
+
+    parser = InlineDataParser(on_start, on_chunk, on_end)
+    for chunk in chunks:
+        state["chunk"] = len(chunk)
+        parser.feed(chunk)
+    return parser.close(), images, stats
+
+
+def first_images(result, images):
+    """First image of every candidate, in candidate order"""
+    picked = []
+    for candidate in result.get("candidates", []):
+        for part in candidate.get("content", {}).get("parts", []):
+            ref = part.get("inlineData", {}).get("data", "")
+            if ref.startswith("@") and int(ref[1:]) in images:
+                picked.append(images[int(ref[1:])])
+                break
+    return picked
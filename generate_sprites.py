@@ -8,15 +8,14 @@ from PIL import Image, ImageDraw, ImageFilter
 import os
 import json
 import math
+import functools
+
+import asset_graph as ag
 
 # Output directory
 ASSETS_DIR = "Shivering Ghosts/Assets.xcassets"
 ASSETS_CLOTHING_DIR = os.path.join(ASSETS_DIR, "kiyafet")
 
-# Ensure directories exist
-os.makedirs(ASSETS_DIR, exist_ok=True)
-os.makedirs(ASSETS_CLOTHING_DIR, exist_ok=True)
-
 # Colors (Pastel Kawaii Palette)
 COLORS = {
     'red': (231, 76, 60),      # Alizarin
@@ -49,23 +48,64 @@ def create_imageset(name, directory=ASSETS_DIR):
     
     return folder
 
+# (scale, filename suffix, resize factor from the 3x original)
+SPRITE_SCALES = [("3x", "@3x", None), ("2x", "@2x", 0.66), ("1x", "", 0.33)]
+
 def save_sprite(img, name, directory=ASSETS_DIR):
     """Save sprite at 1x, 2x, 3x scales"""
     # Create standard imageset structure
     folder = create_imageset(name, directory)
     
-    # Save 3x (Original High Res)
-    img.save(os.path.join(folder, f"{name}@3x.png"))
-    
-    # Save 2x
-    size_2x = (int(img.width * 0.66), int(img.height * 0.66))
-    img.resize(size_2x, Image.Resampling.LANCZOS).save(os.path.join(folder, f"{name}@2x.png"))
-    
-    # Save 1x
-    size_1x = (int(img.width * 0.33), int(img.height * 0.33))
-    img.resize(size_1x, Image.Resampling.LANCZOS).save(os.path.join(folder, f"{name}.png"))
+    # 3x is the original high res; smaller scales resize from it
+    for scale, suffix, factor in SPRITE_SCALES:
+        scaled = img
+        if factor is not None:
+            size = (int(img.width * factor), int(img.height * factor))
+            scaled = img.resize(size, Image.Resampling.LANCZOS)
+        scaled.save(os.path.join(folder, f"{name}{suffix}.png"))
     print(f"  Generated: {name}")
 
+# --- Trimmed Overlays ---
+# Clothing is drawn on a full GHOST_W x GHOST_H canvas so it lines up with
+# the ghost, but most of that canvas is transparent. Trimmed export keeps
+# only the alpha bounds and records where they sit on the canvas.
+ANCHOR_SUFFIX = ".anchor.json"
+
+def trim_to_alpha(img):
+    """Crop to the alpha bounding box. Returns (cropped, bbox)"""
+    bbox = img.getbbox()
+    if not bbox:
+        # Fully transparent: keep as-is so placement stays defined
+        return img, (0, 0, img.width, img.height)
+    return img.crop(bbox), bbox
+
+def anchor_info(canvas_size, bbox):
+    """
+    Placement of a trimmed texture on its original canvas.
+    offset: top-left of the trimmed texture on the canvas (pixels, y-down)
+    anchorPoint: SpriteKit anchor that puts the canvas centre at the node's
+    position, so the trimmed sprite lands exactly where the full one did.
+    """
+    canvas_w, canvas_h = canvas_size
+    x0, y0, x1, y1 = bbox
+    w, h = x1 - x0, y1 - y0
+    return {
+        "canvas": [canvas_w, canvas_h],
+        "offset": [x0, y0],
+        "size": [w, h],
+        "anchorPoint": [
+            round((canvas_w / 2 - x0) / w, 6),
+            round(1 - (canvas_h / 2 - y0) / h, 6),
+        ],
+    }
+
+def write_anchor_sidecar(folder, name, scales):
+    """Write <name>.anchor.json next to Contents.json"""
+    # The graph may run this before any encode node has created the folder
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, f"{name}{ANCHOR_SUFFIX}"), 'w') as f:
+        json.dump({"scales": scales}, f, indent=2)
+
 # --- Drawing Constants for FIT ---
 GHOST_W, GHOST_H = 300, 400
 HEAD_W = GHOST_W * 0.8  # 240
@@ -170,8 +210,15 @@ def draw_kawaii_face(draw, happy=True, shiver=True):
 
 # --- Updated Ghost Functions ---
 
-def draw_ghost():
-    """Draw Standard Kawaii Ghost"""
+# Glow (color, radius) applied on top of each ghost's base drawing
+GHOST_GLOWS = {
+    'standard': ((200, 230, 255), 20),
+    'baby': ((173, 216, 230), 20),
+    'rare': ((230, 230, 250), 25),
+}
+
+def draw_ghost_base():
+    """Draw Standard Kawaii Ghost (without glow)"""
     base = Image.new('RGBA', (GHOST_W, GHOST_H), (0, 0, 0, 0))
     draw = ImageDraw.Draw(base)
     
@@ -182,12 +229,14 @@ def draw_ghost():
     draw_kawaii_body(draw, body_color, outline_color)
     draw_kawaii_face(draw, happy=False, shiver=True)
     
-    # Add Glow
-    final = add_glow(base, (200, 230, 255), radius=20)
-    return final
+    return base
 
-def draw_baby_ghost():
-    """Draw Baby Kawaii Ghost"""
+def draw_ghost():
+    """Draw Standard Kawaii Ghost"""
+    return add_glow(draw_ghost_base(), *GHOST_GLOWS['standard'])
+
+def draw_baby_ghost_base():
+    """Draw Baby Kawaii Ghost (without glow)"""
     base = Image.new('RGBA', (GHOST_W, GHOST_H), (0, 0, 0, 0))
     draw = ImageDraw.Draw(base)
     
@@ -215,11 +264,14 @@ def draw_baby_ghost():
     draw.ellipse([cx-15, mouth_y-10, cx+15, mouth_y+10], fill=(255, 175, 175, 255), outline=outline_color, width=2)
     draw.arc([cx-10, mouth_y, cx+10, mouth_y+15], start=0, end=180, fill=outline_color, width=2)
 
-    final = add_glow(base, (173, 216, 230), radius=20)
-    return final
+    return base
 
-def draw_rare_ghost():
-    """Draw Rare (Premium) Kawaii Ghost"""
+def draw_baby_ghost():
+    """Draw Baby Kawaii Ghost"""
+    return add_glow(draw_baby_ghost_base(), *GHOST_GLOWS['baby'])
+
+def draw_rare_ghost_base():
+    """Draw Rare (Premium) Kawaii Ghost (without glow)"""
     base = Image.new('RGBA', (GHOST_W, GHOST_H), (0, 0, 0, 0))
     draw = ImageDraw.Draw(base)
     
@@ -250,8 +302,11 @@ def draw_rare_ghost():
     for pos in [(80, 100), (220, 80), (250, 250)]:
         draw_star(pos[0], pos[1], 10, (255, 215, 0, 255))
 
-    final = add_glow(base, (230, 230, 250), radius=25)
-    return final
+    return base
+
+def draw_rare_ghost():
+    """Draw Rare (Premium) Kawaii Ghost"""
+    return add_glow(draw_rare_ghost_base(), *GHOST_GLOWS['rare'])
 
 def draw_dead_ghost():
     """Draw Dead Ghost (Burnt Mochi)"""
@@ -281,15 +336,19 @@ def draw_dead_ghost():
     
     return base
 
-def draw_dead_baby_ghost():
-    """Dead Baby"""
-    # Just reuse dead logic with pacifier
-    img = draw_dead_ghost()
+def add_dead_pacifier(img):
+    """Burnt pacifier on top of a dead ghost (draws on a copy)"""
+    img = img.copy()
     draw = ImageDraw.Draw(img)
     cx = GHOST_W // 2
     draw.ellipse([cx-15, 200, cx+15, 220], fill=(80, 40, 40), outline='black', width=2)
     return img
 
+def draw_dead_baby_ghost():
+    """Dead Baby"""
+    # Just reuse dead logic with pacifier
+    return add_dead_pacifier(draw_dead_ghost())
+
 def draw_dead_rare_ghost():
     """Dead Rare"""
     # Reuse dead logic
@@ -418,31 +477,67 @@ def draw_magnet():
     
     return img
 
-def draw_beanie(color_name):
-    """Draw a beanie that fits the ghost head"""
-    img = Image.new('RGBA', (GHOST_W, GHOST_H), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    color = COLORS[color_name]
+# --- Clothing: Shade Masks + Palette LUT ---
+# Each garment is drawn ONCE as an indexed shade mask ('P' image). A colour
+# variant is just that mask with a different RGBA palette, so adding a
+# colour costs one palette lookup instead of a full redraw.
+SHADE_CLEAR = 0   # Transparent background
+SHADE_BASE = 1    # Main fabric colour
+SHADE_DARK = 2    # Outlines (color - 40)
+SHADE_STITCH = 3  # Knit stripes / V's (color - 40, alpha 100)
+SHADE_RIB = 4     # Collar & bottom ribbing (color - 20)
+
+def shade_palette(color):
+    """Build the RGBA palette (shade index -> pixel) for an RGB color"""
     darker = tuple(max(0, c-40) for c in color)
+    rib_color = tuple(max(0, c-20) for c in color)
+    return [
+        (0, 0, 0, 0),
+        (*color, 255),
+        (*darker, 255),
+        (*darker, 100),
+        (*rib_color, 255),
+    ]
+
+def recolor(mask, color):
+    """Apply a color to a shade mask (single C-level palette lookup)"""
+    if isinstance(color, str):
+        color = COLORS[color]
+    img = mask.copy()
+    img.putpalette([v for entry in shade_palette(color) for v in entry], rawmode="RGBA")
+    return img.convert("RGBA")
+
+def _new_mask():
+    mask = Image.new('P', (GHOST_W, GHOST_H), SHADE_CLEAR)
+    return mask, ImageDraw.Draw(mask)
+
+@functools.lru_cache(maxsize=None)
+def beanie_mask():
+    """Beanie shade mask that fits the ghost head"""
+    mask, draw = _new_mask()
     
     # Beanie Position: Top of head (y=20 to y=100)
     # Width matches head width ~240
     
     # Dome
     rect = [40, 10, 260, 150]
-    draw.chord(rect, start=180, end=0, fill=(*color, 255), outline=(*darker, 255), width=6)
+    draw.chord(rect, start=180, end=0, fill=SHADE_BASE, outline=SHADE_DARK, width=6)
     
     # Cuff
-    draw.rounded_rectangle([35, 80, 265, 120], radius=10, fill=(*color, 255), outline=(*darker, 255), width=6)
+    draw.rounded_rectangle([35, 80, 265, 120], radius=10, fill=SHADE_BASE, outline=SHADE_DARK, width=6)
     
     # Striping on cuff
     for x in range(50, 250, 20):
-        draw.line([x, 80, x, 120], fill=(*darker, 100), width=2)
+        draw.line([x, 80, x, 120], fill=SHADE_STITCH, width=2)
         
     # Pom-pom
-    draw.ellipse([125, -5, 175, 45], fill=(*color, 255), outline=(*darker, 255), width=4)
+    draw.ellipse([125, -5, 175, 45], fill=SHADE_BASE, outline=SHADE_DARK, width=4)
                  
-    return img
+    return mask
+
+def draw_beanie(color_name):
+    """Draw a beanie that fits the ghost head"""
+    return recolor(beanie_mask(), color_name)
 
 def draw_witch_hat():
     """Draw a witch hat for purple (special case)"""
@@ -466,63 +561,66 @@ def draw_witch_hat():
     
     return img
 
-def draw_scarf(color_name):
-    """Draw a scarf around the neck"""
-    img = Image.new('RGBA', (GHOST_W, GHOST_H), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    color = COLORS[color_name]
-    darker = tuple(max(0, c-40) for c in color)
+@functools.lru_cache(maxsize=None)
+def scarf_mask():
+    """Scarf shade mask around the neck"""
+    mask, draw = _new_mask()
     
     # Neck Position: y ~180-220
     
     # Main wrap
-    draw.rounded_rectangle([45, 180, 255, 230], radius=15, fill=(*color, 255), outline=(*darker, 255), width=6)
+    draw.rounded_rectangle([45, 180, 255, 230], radius=15, fill=SHADE_BASE, outline=SHADE_DARK, width=6)
     
     # Stripes
     for x in range(60, 240, 25):
-        draw.line([x, 180, x, 230], fill=(*darker, 100), width=3)
+        draw.line([x, 180, x, 230], fill=SHADE_STITCH, width=3)
         
     # Hanging tail (Left side)
     points = [(60, 220), (100, 220), (100, 300), (60, 300)]
-    draw.polygon(points, fill=(*color, 255), outline=(*darker, 255))
+    draw.polygon(points, fill=SHADE_BASE, outline=SHADE_DARK)
     # Outline manually to match style
-    draw.line([(60, 220), (60, 300), (100, 300), (100, 220)], fill=(*darker, 255), width=6)
+    draw.line([(60, 220), (60, 300), (100, 300), (100, 220)], fill=SHADE_DARK, width=6)
 
     # Fringe
     for x in range(65, 100, 10):
-        draw.line([x, 300, x, 315], fill=(*color, 255), width=4)
+        draw.line([x, 300, x, 315], fill=SHADE_BASE, width=4)
         
-    return img
+    return mask
 
-def draw_sweater(color_name):
-    """Draw a sweater for the body"""
-    img = Image.new('RGBA', (GHOST_W, GHOST_H), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    color = COLORS[color_name]
-    darker = tuple(max(0, c-40) for c in color)
-    rib_color = tuple(max(0, c-20) for c in color)
+def draw_scarf(color_name):
+    """Draw a scarf around the neck"""
+    return recolor(scarf_mask(), color_name)
+
+@functools.lru_cache(maxsize=None)
+def sweater_mask():
+    """Sweater shade mask for the body"""
+    mask, draw = _new_mask()
     
     # Body Position: y ~230 down to 320
     
     # Main Body Block
     # Slightly wider at bottom
     body_points = [(50, 230), (250, 230), (260, 310), (40, 310)]
-    draw.polygon(body_points, fill=(*color, 255))
-    draw.line(body_points + [body_points[0]], fill=(*darker, 255), width=6)
+    draw.polygon(body_points, fill=SHADE_BASE)
+    draw.line(body_points + [body_points[0]], fill=SHADE_DARK, width=6)
     
     # Collar
-    draw.ellipse([80, 220, 220, 250], fill=(*rib_color, 255), outline=(*darker, 255), width=5)
+    draw.ellipse([80, 220, 220, 250], fill=SHADE_RIB, outline=SHADE_DARK, width=5)
     
     # Bottom Ribbing
-    draw.rectangle([42, 300, 258, 320], fill=(*rib_color, 255), outline=(*darker, 255), width=5)
+    draw.rectangle([42, 300, 258, 320], fill=SHADE_RIB, outline=SHADE_DARK, width=5)
     
     # Texture (Knitting V's)
     for y in range(250, 300, 20):
         for x in range(70, 230, 20):
-            draw.line([x, y, x+5, y+5], fill=(*darker, 100), width=2)
-            draw.line([x+5, y+5, x+10, y], fill=(*darker, 100), width=2)
+            draw.line([x, y, x+5, y+5], fill=SHADE_STITCH, width=2)
+            draw.line([x+5, y+5, x+10, y], fill=SHADE_STITCH, width=2)
             
-    return img
+    return mask
+
+def draw_sweater(color_name):
+    """Draw a sweater for the body"""
+    return recolor(sweater_mask(), color_name)
 
 
 def save_cropped_clothing(img, name):
@@ -535,44 +633,119 @@ def save_cropped_clothing(img, name):
     # Scale up slightly to add padding if needed, or just save
     save_sprite(img, name)
 
-def main():
+# --- Catalog Graph ---
+# The whole catalog as one asset_graph DAG: draw -> glow/recolor -> resize
+# -> (crop) -> encode. Shared nodes (the dead ghost, each garment mask)
+# are evaluated once, independent sprites run in parallel.
+
+def _draw(fn, *args):
+    return ag.node("draw", fn, (), *args)
+
+def _write_anchors(*args):
+    """Graph op: anchor sidecar from the untrimmed 3x/2x/1x images"""
+    *scaled, name, directory = args
+    scales = {}
+    for (scale, _, _), img in zip(SPRITE_SCALES, scaled):
+        scales[scale] = anchor_info(img.size, trim_to_alpha(img)[1])
+    write_anchor_sidecar(os.path.join(directory, f"{name}.imageset"), name, scales)
+
+def _finish_imageset(*args):
+    """Graph op: Contents.json once every scale is encoded"""
+    *paths, name, directory = args
+    create_imageset(name, directory)
+    print(f"  Generated: {name}")
+    return paths
+
+def sprite_nodes(img, name, directory=ASSETS_DIR, trim=False):
+    """Graph equivalent of save_sprite, optionally trimmed with an anchor sidecar"""
+    folder = os.path.join(directory, f"{name}.imageset")
+    scaled, outputs = [], []
+    for scale, suffix, factor in SPRITE_SCALES:
+        src = img if factor is None else ag.resize(img, factor)
+        scaled.append(src)
+        out = ag.crop(src) if trim else src
+        outputs.append(ag.encode(out, os.path.join(folder, f"{name}{suffix}.png")))
+    if trim:
+        outputs.append(ag.node("anchor", _write_anchors, scaled, name, directory))
+    return ag.node("imageset", _finish_imageset, outputs, name, directory)
+
+def catalog_sprites(trim=False):
+    """(image node, name, trim) for every sprite main() generates"""
+    def glow(base_fn, kind):
+        return ag.node("glow", add_glow, [_draw(base_fn)], *GHOST_GLOWS[kind])
+    
+    def recolored(mask_fn, color_name):
+        return ag.node("recolor", recolor, [_draw(mask_fn)], color_name)
+    
+    # Dead variants all share one dead ghost drawing
+    dead = _draw(draw_dead_ghost)
+    
+    ghosts = {
+        "ghost_standard": glow(draw_ghost_base, 'standard'),
+        "ghost_baby": glow(draw_baby_ghost_base, 'baby'),
+        "ghost_rare": glow(draw_rare_ghost_base, 'rare'),
+        "ghost_dead": dead,
+        "ghost_baby_dead": ag.node("draw", add_dead_pacifier, [dead]),
+        "ghost_rare_dead": dead,
+    }
+    
+    clothing = {
+        # Hats (3 colors: Red, Blue, Yellow)
+        "kirmizi_sapka": recolored(beanie_mask, 'red'),
+        "mavi_sapka": recolored(beanie_mask, 'blue'),
+        "sari_sapka": recolored(beanie_mask, 'yellow'),
+        # Scarves (3 colors: Red, Blue, Green)
+        "kirmizi_atki": recolored(scarf_mask, 'red'),
+        "mavi_atki": recolored(scarf_mask, 'blue'),
+        "yesil_atki": recolored(scarf_mask, 'green'),
+        # Sweaters (3 colors: Purple, Orange, Pink)
+        "mor_kazak": recolored(sweater_mask, 'purple'),
+        "turuncu_kazak": recolored(sweater_mask, 'orange'),
+        "pembe_kazak": recolored(sweater_mask, 'pink'),
+    }
+    
+    effects = {
+        "leaf": _draw(draw_leaf),
+        "heart": _draw(draw_heart),
+        "icicle_sweat": _draw(draw_sweat),
+        "powerup_cocoa": _draw(draw_hot_chocolate),
+        "powerup_campfire": _draw(draw_campfire),
+        "powerup_magnet": _draw(draw_magnet),
+    }
+    
+    sprites = [(img, name, False) for name, img in ghosts.items()]
+    # Clothing overlays: optionally trimmed to alpha bounds + anchor sidecar
+    sprites += [(img, name, trim) for name, img in clothing.items()]
+    sprites += [(img, name, False) for name, img in effects.items()]
+    return sprites
+
+def catalog_nodes(trim=False):
+    """Build the graph for every sprite main() generates"""
+    return [sprite_nodes(img, name, trim=t) for img, name, t in catalog_sprites(trim)]
+
+def sprite_outputs(name, trim=False):
+    """Files one sprite_nodes() imageset writes, relative to the catalog"""
+    folder = f"{name}.imageset"
+    files = [f"{name}{suffix}.png" for _, suffix, _ in SPRITE_SCALES] + ["Contents.json"]
+    if trim:
+        files.append(f"{name}{ANCHOR_SUFFIX}")
+    return [os.path.join(folder, f) for f in files]
+
+def catalog_outputs(trim=False):
+    """Every file main() writes, relative to ASSETS_DIR"""
+    return [path for _, name, t in catalog_sprites(trim) for path in sprite_outputs(name, t)]
+
+def main(trim=False, workers=None):
     print("🎨 Generating Shivering Ghosts Assets...")
     
-    # 1. Ghost
-    ghost = draw_ghost()
-    save_sprite(ghost, "ghost_standard")
-    
-    save_sprite(draw_baby_ghost(), "ghost_baby")
-    save_sprite(draw_rare_ghost(), "ghost_rare")
-    save_sprite(draw_dead_ghost(), "ghost_dead")
-    save_sprite(draw_dead_baby_ghost(), "ghost_baby_dead")
-    save_sprite(draw_dead_rare_ghost(), "ghost_rare_dead")
-    
-    # 2. Hats (3 colors: Red, Blue, Yellow)
-    save_sprite(draw_beanie('red'), "kirmizi_sapka")
-    save_sprite(draw_beanie('blue'), "mavi_sapka")
-    save_sprite(draw_beanie('yellow'), "sari_sapka")
-    
-    # 3. Scarves (3 colors: Red, Blue, Green)
-    save_sprite(draw_scarf('red'), "kirmizi_atki")
-    save_sprite(draw_scarf('blue'), "mavi_atki")
-    save_sprite(draw_scarf('green'), "yesil_atki")
-    
-    # 4. Sweaters (3 colors: Purple, Orange, Pink)
-    save_sprite(draw_sweater('purple'), "mor_kazak")
-    save_sprite(draw_sweater('orange'), "turuncu_kazak")
-    save_sprite(draw_sweater('pink'), "pembe_kazak")
-    
-    # 5. Effects & Power-ups
-    save_sprite(draw_leaf(), "leaf")
-    save_sprite(draw_heart(), "heart")
-    save_sprite(draw_sweat(), "icicle_sweat")
-    
-    save_sprite(draw_hot_chocolate(), "powerup_cocoa")
-    save_sprite(draw_campfire(), "powerup_campfire")
-    save_sprite(draw_magnet(), "powerup_magnet")
-    
-    print("✅ Done!")
+    # Ensure directories exist
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+    os.makedirs(ASSETS_CLOTHING_DIR, exist_ok=True)
+    
+    build = ag.Build(workers)
+    build.run(catalog_nodes(trim))
+    
+    print(f"✅ Done! ({build.evaluated} ops, {build.reused} shared)")
 
 if __name__ == "__main__":
     main()
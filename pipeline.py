@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Shivering Ghosts - Asset Pipeline
+Single entry point for all asset scripts.
+
+    python3 pipeline.py sprites      # PIL vector-style sprites
+    python3 pipeline.py ai-sprites   # Gemini image sprites (needs GEMINI_API_KEY)
+    python3 pipeline.py ai-svgs      # Gemini SVG designs (needs GEMINI_API_KEY)
+    python3 pipeline.py audio        # mp3 -> m4a (macOS afconvert)
+
+Every subcommand imports its script lazily, so `--help` never loads
+PIL / requests / google.generativeai and nothing touches the disk.
+"""
+
+import argparse
+import os
+import sys
+
+ASSETS_DIR = "Shivering Ghosts/Assets.xcassets"
+AUDIO_DIR = "Shivering Ghosts"
+CACHE_ENV = "ASSET_CACHE"
+MIN_CHUNK_SECONDS = 1024 / 44100    # One AAC packet at convert_audio.LOOP_RATE
+
+
+def chunk_seconds(value):
+    """argparse type for --chunk-seconds: at least one AAC packet long"""
+    seconds = float(value)
+    if not seconds >= MIN_CHUNK_SECONDS:
+        raise argparse.ArgumentTypeError(f"must be at least {MIN_CHUNK_SECONDS:.4f}s, got {value}")
+    return seconds
+
+
+def run_sprites(args):
+    import artifact_cache
+    tools = artifact_cache.package_versions("Pillow", "numpy")
+    if args.sdf:
+        import sdf_export
+
+        def build():
+            return sdf_export.main(size=args.sdf_size, spread=args.sdf_spread, workers=args.workers)
+        return artifact_cache.run_stage(
+            args.cache, "sprites-sdf", build, ASSETS_DIR, sdf_export.sdf_outputs(),
+            code=["sdf_export.py", "generate_sprites.py", "asset_graph.py"],
+            params={"size": args.sdf_size, "spread": args.sdf_spread, "tools": tools},
+        )
+
+    import generate_sprites
+
+    def build():
+        return generate_sprites.main(trim=args.trim, workers=args.workers)
+    return artifact_cache.run_stage(
+        args.cache, "sprites", build, ASSETS_DIR, generate_sprites.catalog_outputs(args.trim),
+        code=["generate_sprites.py", "asset_graph.py"],
+        params={"trim": args.trim, "tools": tools},
+    )
+
+
+def run_ai_sprites(args):
+    import artifact_cache
+    import generate_ai_sprites
+
+    def build():
+        return generate_ai_sprites.main(
+            trim=args.trim, candidates=args.candidates,
+            record_dir=args.record, replay_dir=args.replay, stream=args.stream,
+        )
+    if not args.replay:
+        # Live API output is not a function of its inputs: never cached
+        return build()
+    return artifact_cache.run_stage(
+        args.cache, "ai-sprites", build, ASSETS_DIR, generate_ai_sprites.ai_outputs(args.trim),
+        code=["generate_ai_sprites.py", "gemini_stream.py", "generate_sprites.py"],
+        params={"trim": args.trim, "candidates": args.candidates, "stream": args.stream,
+                "tools": artifact_cache.package_versions("Pillow", "numpy")},
+        sources=artifact_cache.source_files(args.replay),
+    )
+
+
+def run_ai_svgs(args):
+    import generate_ai_svgs
+    return generate_ai_svgs.main(optimize=not args.no_optimize)
+
+
+def run_svg_opt(args):
+    import svg_optimize
+    return svg_optimize.main(args.files, precision=args.precision,
+                             tolerance=args.tolerance, check=not args.no_check)
+
+
+def run_audio(args):
+    import functools
+    import platform
+    import artifact_cache
+    import convert_audio
+    if args.sprite:
+        stage, names = "audio-sprite", convert_audio.SFX_NAMES
+        build = functools.partial(convert_audio.build_sfx_sprite, verify=args.verify)
+        outputs = convert_audio.sfx_sprite_outputs()
+    elif args.loop:
+        stage, names = "audio-loop", convert_audio.LOOP_NAMES
+        build = functools.partial(convert_audio.build_loops, chunk_seconds=args.chunk_seconds)
+        # Chunk count depends on the track: read back from <name>_loop.json
+        outputs = convert_audio.loop_outputs
+    else:
+        # In-place mp3 -> m4a (deletes its sources): nothing to cache
+        return convert_audio.convert_mp3_to_m4a()
+    return artifact_cache.run_stage(
+        args.cache, stage, build, AUDIO_DIR, outputs,
+        code=["convert_audio.py"],
+        # afconvert's AAC encoder ships with macOS
+        params={"chunk_seconds": args.chunk_seconds, "macos": platform.mac_ver()[0]},
+        sources=[convert_audio.find_source(n) or os.path.join(AUDIO_DIR, n) for n in names],
+    )
+
+
+def run_diff(args):
+    import diff_catalog
+    return diff_catalog.main(
+        args.golden, args.build,
+        heatmap_dir=args.heatmaps, report=args.report, workers=args.workers,
+        max_error=args.max_error, mean_error=args.mean_error,
+        min_ssim=args.min_ssim, max_changed=args.max_changed,
+    )
+
+
+def run_cache_server(args):
+    import artifact_cache
+    return artifact_cache.main(args.dir, args.host, args.port, args.max_mb)
+
+
+def run_budget(args):
+    import texture_budget
+    return texture_budget.main(args.manifest, args.catalog, pot=args.pot, verbose=args.verbose)
+
+
+def build_parser():
+    """Build the argparse CLI (no heavy imports here)"""
+    parser = argparse.ArgumentParser(
+        prog="pipeline.py",
+        description="Shivering Ghosts asset pipeline",
+    )
+    parser.add_argument("--cache", metavar="DIR|URL", default=os.environ.get(CACHE_ENV),
+                        help="Artifact cache store(s), comma-separated: pull before building, "
+                             f"push after (default: ${CACHE_ENV})")
+    sub = parser.add_subparsers(dest="command", metavar="<command>")
+
+    p = sub.add_parser("sprites", help="Generate PIL sprites into Assets.xcassets")
+    p.add_argument("--sdf", action="store_true",
+                   help="Export particles & power-ups as single-channel SDF textures (<name>_sdf)")
+    p.add_argument("--sdf-size", type=int, default=32, help="SDF texture edge in pixels (default: 32)")
+    p.add_argument("--sdf-spread", type=float, default=8, help="SDF spread in source pixels (default: 8)")
+    p.add_argument("--trim", action="store_true",
+                   help="Trim clothing overlays to alpha bounds and write <name>.anchor.json")
+    p.add_argument("--workers", type=int, help="Parallel graph workers (default: CPU count, max 8)")
+    p.set_defaults(func=run_sprites)
+
+    p = sub.add_parser("ai-sprites", help="Generate sprites with the Gemini image API")
+    p.add_argument("--trim", action="store_true",
+                   help="Trim clothing overlays to alpha bounds and write <name>.anchor.json")
+    p.add_argument("--candidates", type=int, default=1,
+                   help="Images requested per prompt; the best-scoring one is kept (default: 1)")
+    p.add_argument("--record", metavar="DIR", help="Save raw API responses as DIR/<name>.json")
+    p.add_argument("--replay", metavar="DIR", help="Use recorded responses instead of the API")
+    p.add_argument("--stream", action="store_true",
+                   help="Parse responses incrementally and draft-decode images (bounded memory)")
+    p.set_defaults(func=run_ai_sprites)
+
+    p = sub.add_parser("ai-svgs", help="Generate SVG designs with Gemini")
+    p.add_argument("--no-optimize", action="store_true", help="Keep the raw SVG the model returned")
+    p.set_defaults(func=run_ai_svgs)
+
+    p = sub.add_parser("svg-opt", help="Minify SVGs: collapse groups, simplify paths, quantize")
+    p.add_argument("files", nargs="+", help="SVG files (rewritten in place)")
+    p.add_argument("--precision", type=int, help="Decimals kept (default: from viewBox size)")
+    p.add_argument("--tolerance", type=float,
+                   help="Max path deviation in user units (default: 0.1%% of viewBox)")
+    p.add_argument("--no-check", action="store_true",
+                   help="Skip the rasterized before/after equivalence check")
+    p.set_defaults(func=run_svg_opt)
+
+    p = sub.add_parser("audio", help="Convert .mp3 sounds to .m4a")
+    p.add_argument("--sprite", action="store_true",
+                   help="Pack the short SFX into sfx_sprite.m4a + sfx_sprite.json offset table")
+    p.add_argument("--verify", action="store_true",
+                   help="With --sprite: decode the result and check every segment")
+    p.add_argument("--loop", action="store_true",
+                   help="Trim game_music / wind_ambience to their best loop point (+ <name>_loop.json)")
+    p.add_argument("--chunk-seconds", type=chunk_seconds, default=None, metavar="S",
+                   help="With --loop: split each track into S-second chunks for streamed playback")
+    p.set_defaults(func=run_audio)
+
+    p = sub.add_parser("diff", help="Compare two asset catalogs image by image (regression gate)")
+    p.add_argument("golden", help="Golden (reference) catalog directory")
+    p.add_argument("build", help="Freshly built catalog directory")
+    p.add_argument("--heatmaps", metavar="DIR", help="Write heat maps for failing images here")
+    p.add_argument("--report", metavar="FILE", help="Write all metrics as JSON")
+    p.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    p.add_argument("--max-error", type=float, default=0, help="Max channel error allowed (default: 0)")
+    p.add_argument("--mean-error", type=float, default=0.0, help="Mean error allowed (default: 0)")
+    p.add_argument("--min-ssim", type=float, default=1.0, help="Lowest SSIM allowed (default: 1.0)")
+    p.add_argument("--max-changed", type=float, default=0.0,
+                   help="Fraction of changed pixels allowed (default: 0)")
+    p.set_defaults(func=run_diff)
+
+    p = sub.add_parser("budget", help="Check decoded texture memory per scene against budgets")
+    p.add_argument("--manifest", default="texture_scenes.json", help="Scene manifest (default: texture_scenes.json)")
+    p.add_argument("--catalog", default="Shivering Ghosts/Assets.xcassets", help="Asset catalog directory")
+    p.add_argument("--pot", action="store_true", help="Pad textures to power-of-two sizes (atlases / older GPUs)")
+    p.add_argument("-v", "--verbose", action="store_true", help="List every texture per scene")
+    p.set_defaults(func=run_budget)
+
+    p = sub.add_parser("cache-server", help="Serve a directory as a simple HTTP artifact cache")
+    p.add_argument("dir", help="Blob directory")
+    p.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    p.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    p.add_argument("--max-mb", type=int, default=2048, help="Evict LRU blobs past this size (default: 2048)")
+    p.set_defaults(func=run_cache_server)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return 0
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Shivering Ghosts - SDF Exporter
+Turns simple flat shapes (particles, power-up icons) into small
+single-channel signed-distance-field textures.
+
+One SDF texture renders with a sharp edge at any size, so particles and
+storm effects no longer need full RGBA bitmaps at 1x/2x/3x.
+
+Encoding (8-bit, single channel):
+    128 = exactly on the edge, >128 inside, <128 outside.
+    value = 128 + 127 * distance / spread   (clamped)
+A shader reconstructs the shape with smoothstep around 0.5.
+"""
+
+import json
+import os
+
+import asset_graph as ag
+from generate_sprites import (
+    ASSETS_DIR, draw_leaf, draw_heart, draw_sweat,
+    draw_hot_chocolate, draw_campfire, draw_magnet,
+)
+
+# Default SDF settings
+SDF_SIZE = 32      # Output texture edge (pixels)
+SDF_SPREAD = 8     # Distance (in source pixels) mapped to the full 0..255 range
+ALPHA_CUTOFF = 128 # Source alpha >= cutoff counts as "inside"
+
+# Particles & power-ups exported as SDF textures
+SDF_SHAPES = {
+    "leaf": draw_leaf,
+    "heart": draw_heart,
+    "icicle_sweat": draw_sweat,
+    "powerup_cocoa": draw_hot_chocolate,
+    "powerup_campfire": draw_campfire,
+    "powerup_magnet": draw_magnet,
+}
+
+# Rows/columns processed per chunk in each pass (keeps memory flat on big inputs)
+_ROW_CHUNK = 32
+
+
+def _edt_squared(feature):
+    """
+    Exact squared Euclidean distance transform (two separable passes).
+    `feature` is a bool array; returns squared distance of every pixel to
+    the nearest True pixel. Fully vectorized with numpy broadcasting.
+    """
+    import numpy as np
+
+    h, w = feature.shape
+    inf = float(h * h + w * w)
+
+    # Pass 1 (columns): g[i, j] = min_k (i - k)^2 over feature rows k
+    rows = np.arange(h, dtype=np.float64)
+    col_d2 = (rows[:, None] - rows[None, :]) ** 2          # (h, h)
+    g = np.full((h, w), inf)
+    for j0 in range(0, w, _ROW_CHUNK):
+        f = feature[:, j0:j0 + _ROW_CHUNK]                 # (h, c)
+        cand = np.where(f[None, :, :], col_d2[:, :, None], inf)
+        g[:, j0:j0 + _ROW_CHUNK] = cand.min(axis=1)
+
+    # Pass 2 (rows): d[i, j] = min_k g[i, k] + (j - k)^2
+    cols = np.arange(w, dtype=np.float64)
+    row_d2 = (cols[:, None] - cols[None, :]) ** 2          # (w, w)
+    d = np.empty((h, w))
+    for i0 in range(0, h, _ROW_CHUNK):
+        gc = g[i0:i0 + _ROW_CHUNK]                         # (c, w)
+        d[i0:i0 + _ROW_CHUNK] = (gc[:, None, :] + row_d2[None, :, :]).min(axis=2)
+
+    return d
+
+
+def compute_sdf(img, spread=SDF_SPREAD, cutoff=ALPHA_CUTOFF):
+    """
+    Compute a signed distance field from the alpha channel of an RGBA image.
+    Returns a float array (pixels): positive inside, negative outside.
+    """
+    import numpy as np
+
+    alpha = np.asarray(img.convert("RGBA").getchannel("A"))
+    inside = alpha >= cutoff
+
+    if not inside.any():
+        return np.full(alpha.shape, -float(spread))
+    if inside.all():
+        return np.full(alpha.shape, float(spread))
+
+    # Distance to the other side, measured to pixel edges (hence -0.5)
+    dist_out = np.sqrt(_edt_squared(inside)) - 0.5
+    dist_in = np.sqrt(_edt_squared(~inside)) - 0.5
+    return np.where(inside, dist_in, -dist_out)
+
+
+def sdf_to_image(sdf, spread=SDF_SPREAD, size=SDF_SIZE):
+    """Encode a float SDF into a small 8-bit 'L' texture"""
+    import numpy as np
+    from PIL import Image
+
+    encoded = np.clip(128.0 + 127.0 * sdf / spread, 0, 255).astype(np.uint8)
+    field = Image.fromarray(encoded, mode="L")
+
+    # SDFs are smooth, so plain bilinear downsampling keeps the edge exact
+    h, w = sdf.shape
+    scale = size / max(w, h)
+    out_size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return field.resize(out_size, Image.Resampling.BILINEAR)
+
+
+def save_sdf_sprite(img, name, size=SDF_SIZE, spread=SDF_SPREAD, directory=ASSETS_DIR):
+    """
+    Save `img` as `<name>_sdf.imageset` with a single universal SDF texture
+    plus `<name>_sdf.json` describing how to decode it.
+    """
+    sdf_name = f"{name}_sdf"
+    folder = os.path.join(directory, f"{sdf_name}.imageset")
+    os.makedirs(folder, exist_ok=True)
+
+    texture = sdf_to_image(compute_sdf(img, spread), spread, size)
+    texture.save(os.path.join(folder, f"{sdf_name}.png"), optimize=True)
+
+    contents = {
+        "images": [{"filename": f"{sdf_name}.png", "idiom": "universal"}],
+        "info": {"author": "xcode", "version": 1}
+    }
+    with open(os.path.join(folder, "Contents.json"), 'w') as f:
+        json.dump(contents, f, indent=2)
+
+    # Texture-space spread, needed by the shader to get a 1px-wide edge
+    meta = {
+        "source_size": list(img.size),
+        "size": list(texture.size),
+        "spread": spread,
+        "spread_texels": spread * texture.width / img.width,
+        "edge_value": 128,
+    }
+    with open(os.path.join(folder, f"{sdf_name}.json"), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"  Generated SDF: {sdf_name} {texture.width}x{texture.height}")
+
+
+def sdf_outputs():
+    """Every file main() writes, relative to ASSETS_DIR"""
+    outputs = []
+    for name in SDF_SHAPES:
+        folder = f"{name}_sdf.imageset"
+        outputs += [os.path.join(folder, f) for f in (f"{name}_sdf.png", f"{name}_sdf.json", "Contents.json")]
+    return outputs
+
+
+def main(size=SDF_SIZE, spread=SDF_SPREAD, workers=None):
+    print("🔷 Generating SDF particle & power-up textures...")
+
+    # Same draw nodes as the RGBA catalog graph; one SDF node per shape
+    ag.Build(workers).run([
+        ag.node("sdf", save_sdf_sprite, [ag.node("draw", draw)], name, size, spread)
+        for name, draw in SDF_SHAPES.items()
+    ])
+
+    print("✅ Done!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1148 @@
+#!/usr/bin/env python3
+"""
+Shivering Ghosts - SVG Optimizer
+The designs generate_ai_svgs saves are raw LLM output: nested groups,
+stacked transforms, 6+ decimals and hundreds of tiny path segments.
+This pass rewrites them losslessly-enough for the game:
+
+- collapses plain <g> wrappers (attributes pushed down, transforms composed)
+- bakes transforms into path / shape coordinates where that is exact
+- simplifies paths within a distance tolerance: near-straight curves
+  become lines, line runs go through Ramer-Douglas-Peucker, smooth
+  cubic runs are refitted into fewer cubics
+- quantizes coordinates and writes the shortest path syntax
+
+Precision and tolerance default to the viewBox size (0.1% of its extent)
+and are rescaled under transforms that stay in place. Geometry in other
+coordinate systems (nested <svg>, symbols, clip paths, masks, patterns,
+markers, defs) is never simplified or quantized.
+Each result is rasterized next to the original and only kept when it is
+visually equivalent (mean error + SSIM, same metrics as diff_catalog);
+documents with geometry the rasterizer cannot draw are not rewritten.
+"""
+
+import math
+import re
+import xml.etree.ElementTree as ET
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+EDITOR_NS = ("sodipodi", "inkscape", "sketch", "adobe")
+
+TOLERANCE_FRACTION = 0.001   # Default simplification tolerance (of viewBox extent)
+SMOOTH_JOINT = 0.05          # Max sin(angle) between tangents to merge two cubics
+CURVE_SAMPLES = 10           # Samples per cubic when refitting
+FIT_ITERATIONS = 8           # Newton reparameterization steps per refit
+
+RASTER_SIZE = 256            # Longest side of the equivalence check render
+SUPERSAMPLE = 3
+MAX_MEAN_ERROR = 1.0         # Premultiplied RGBA, 0-255
+MIN_SSIM = 0.98
+
+DROP_TAGS = {"metadata"}
+SHAPES = {"path", "rect", "circle", "ellipse", "line", "polyline", "polygon"}
+GRAPHICS = SHAPES | {"g", "use", "text", "image"}
+CONTAINERS = {"svg", "g", "a", "defs", "symbol", "clipPath", "mask", "pattern", "marker", "switch"}
+# Inherited properties: pushing them from a <g> onto its children is exact
+INHERITED = {
+    "fill", "fill-opacity", "fill-rule", "stroke", "stroke-width", "stroke-linecap",
+    "stroke-linejoin", "stroke-miterlimit", "stroke-dasharray", "stroke-dashoffset",
+    "stroke-opacity", "color", "visibility", "clip-rule", "font-family", "font-size",
+    "font-weight", "font-style", "text-anchor",
+}
+PRESENTATION = INHERITED | {"opacity", "display", "clip-path", "mask", "filter", "stop-color", "stop-opacity"}
+# Children may be drawn in another coordinate system (nested viewport,
+# objectBoundingBox units, <use> transforms): their geometry is not simplified
+FOREIGN_SPACES = {"svg", "defs", "symbol", "clipPath", "mask", "pattern", "marker"}
+# Geometry rasterize() never draws, so the equivalence check cannot vouch
+# for it (<defs> only when it holds graphics: gradients alone are fine).
+# Text and images are only ever moved exactly, never simplified.
+UNDRAWN = (FOREIGN_SPACES - {"defs"}) | {"use"}
+GEOMETRY = ("x", "y", "width", "height", "cx", "cy", "r", "rx", "ry", "x1", "y1", "x2", "y2", "stroke-width")
+
+_NUM_RE = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_TRANSFORM_RE = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+_ARGS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _num(value):
+    """Plain number (optionally 'px'), else None (units, percentages)"""
+    if value is None:
+        return None
+    value = value.strip()
+    if value.endswith("px"):
+        value = value[:-2]
+    m = _NUM_RE.fullmatch(value)
+    return float(value) if m else None
+
+
+def fmt(v, precision):
+    """Shortest decimal for v at `precision` digits: 0.50 -> .5, -0 -> 0"""
+    s = f"{v:.{precision}f}"
+    if "." in s:
+        s = s.rstrip("0").rstrip(".")
+    if s in ("-0", ""):
+        return "0"
+    if s.startswith("0."):
+        return s[1:]
+    if s.startswith("-0."):
+        return "-" + s[2:]
+    return s
+
+
+def _needs_space(prev, p):
+    """Separator needed between number strings prev and p?"""
+    return bool(prev) and not (p.startswith("-") or (p.startswith(".") and "." in prev))
+
+
+def _join(parts):
+    """Join numbers with the minimum separators ('1-2', '.5.5')"""
+    out, prev = "", ""
+    for p in parts:
+        out += (" " if _needs_space(prev, p) else "") + p
+        prev = p
+    return out
+
+
+# --- Path Data ---
+
+def parse_path(d):
+    """
+    Parse SVG path data into absolute segments [(cmd, [numbers])] using only
+    M, L, C, Q, A and Z (H/V become L, S/T are expanded). Raises ValueError.
+    """
+    segs = []
+    pos, n = 0, len(d)
+    x = y = sx = sy = 0.0
+    ctrl = None    # (kind, x, y) of the last control point, for S/T
+    cmd = None
+
+    def skip(pos):
+        while pos < n and (d[pos].isspace() or d[pos] == ","):
+            pos += 1
+        return pos
+
+    while True:
+        pos = skip(pos)
+        if pos >= n:
+            break
+        c = d[pos]
+        if c.isalpha():
+            if c.upper() not in _ARGS:
+                raise ValueError(f"bad path command {c!r}")
+            cmd = c
+            pos += 1
+            if cmd in "Zz":
+                segs.append(("Z", []))
+                x, y, ctrl = sx, sy, None
+                continue
+        elif cmd is None or cmd in "Zz":
+            raise ValueError("path data without a command")
+
+        args = []
+        for k in range(_ARGS[cmd.upper()]):
+            pos = skip(pos)
+            if cmd in "Aa" and k in (3, 4):
+                # Arc flags may be packed without separators ("0110 10")
+                if pos >= n or d[pos] not in "01":
+                    raise ValueError("bad arc flag")
+                args.append(float(d[pos]))
+                pos += 1
+                continue
+            m = _NUM_RE.match(d, pos)
+            if not m:
+                raise ValueError(f"expected a number at {pos}")
+            args.append(float(m.group()))
+            pos = m.end()
+
+        rel = cmd.islower()
+        ox, oy = (x, y) if rel else (0.0, 0.0)
+        up = cmd.upper()
+        if up == "M":
+            x, y = ox + args[0], oy + args[1]
+            sx, sy = x, y
+            segs.append(("M", [x, y]))
+            cmd = "l" if rel else "L"    # Extra pairs are implicit lineto
+            ctrl = None
+        elif up in "LHV":
+            if up == "H":
+                x = ox + args[0]
+            elif up == "V":
+                y = (y if rel else 0.0) + args[0]
+            else:
+                x, y = ox + args[0], oy + args[1]
+            segs.append(("L", [x, y]))
+            ctrl = None
+        elif up in "CS":
+            if up == "C":
+                x1, y1 = ox + args[0], oy + args[1]
+                rest = args[2:]
+            else:
+                x1, y1 = (2 * x - ctrl[1], 2 * y - ctrl[2]) if ctrl and ctrl[0] == "C" else (x, y)
+                rest = args
+            x2, y2 = ox + rest[0], oy + rest[1]
+            x, y = ox + rest[2], oy + rest[3]
+            segs.append(("C", [x1, y1, x2, y2, x, y]))
+            ctrl = ("C", x2, y2)
+        elif up in "QT":
+            if up == "Q":
+                x1, y1 = ox + args[0], oy + args[1]
+                x, y = ox + args[2], oy + args[3]
+            else:
+                x1, y1 = (2 * x - ctrl[1], 2 * y - ctrl[2]) if ctrl and ctrl[0] == "Q" else (x, y)
+                x, y = ox + args[0], oy + args[1]
+            segs.append(("Q", [x1, y1, x, y]))
+            ctrl = ("Q", x1, y1)
+        else:
+            x, y = ox + args[5], oy + args[6]
+            segs.append(("A", args[:5] + [x, y]))
+            ctrl = None
+    return segs
+
+
+def _endpoint(seg):
+    return tuple(seg[1][-2:]) if seg[0] != "Z" else None
+
+
+def serialize_path(segs, precision):
+    """Shortest path data: per segment absolute or relative, H/V, S/T, implicit letters"""
+    q = lambda v: round(v, precision)
+    f = lambda v: fmt(v, precision)
+    out, prev_letter, prev_num = [], None, ""
+    cx = cy = sx = sy = 0.0
+    last = None    # (cmd, control x, y) in quantized coordinates, for S/T
+
+    def emit(letter, nums):
+        nonlocal prev_letter, prev_num
+        parts = [f(v) for v in nums]
+        implicit = letter == prev_letter or (prev_letter, letter) in (("M", "L"), ("m", "l"))
+        if implicit:
+            out.append((" " if _needs_space(prev_num, parts[0]) else "") + _join(parts))
+        else:
+            out.append(letter + _join(parts))
+        prev_letter = {"M": "L", "m": "l"}.get(letter, letter)
+        prev_num = parts[-1]
+
+    def shortest(options):
+        # options: [(letter, nums)]
+        return min(options, key=lambda o: len(o[0]) + len(_join([f(v) for v in o[1]])))
+
+    for cmd, args in segs:
+        if cmd == "Z":
+            out.append("z")
+            prev_letter, prev_num = "z", ""
+            cx, cy, last = sx, sy, None
+            continue
+        a = [q(v) for v in args]
+        if cmd == "M":
+            letter, nums = shortest([("M", a), ("m", [q(a[0] - cx), q(a[1] - cy)])])
+            emit(letter, nums)
+            cx, cy = sx, sy = a[0], a[1]
+            last = None
+        elif cmd == "L":
+            x, y = a
+            opts = [("L", [x, y]), ("l", [q(x - cx), q(y - cy)])]
+            if y == cy:
+                opts += [("H", [x]), ("h", [q(x - cx)])]
+            elif x == cx:
+                opts += [("V", [y]), ("v", [q(y - cy)])]
+            emit(*shortest(opts))
+            cx, cy, last = x, y, None
+        elif cmd == "C":
+            x1, y1, x2, y2, x, y = a
+            if last and last[0] == "C" and q(2 * cx - last[1]) == x1 and q(2 * cy - last[2]) == y1:
+                opts = [("S", [x2, y2, x, y]), ("s", [q(x2 - cx), q(y2 - cy), q(x - cx), q(y - cy)])]
+            else:
+                opts = [("C", a), ("c", [q(v - (cx if i % 2 == 0 else cy)) for i, v in enumerate(a)])]
+            emit(*shortest(opts))
+            cx, cy, last = x, y, ("C", x2, y2)
+        elif cmd == "Q":
+            x1, y1, x, y = a
+            if last and last[0] == "Q" and q(2 * cx - last[1]) == x1 and q(2 * cy - last[2]) == y1:
+                opts = [("T", [x, y]), ("t", [q(x - cx), q(y - cy)])]
+            else:
+                opts = [("Q", a), ("q", [q(v - (cx if i % 2 == 0 else cy)) for i, v in enumerate(a)])]
+            emit(*shortest(opts))
+            cx, cy, last = x, y, ("Q", x1, y1)
+        else:
+            rx, ry, rot, large, sweep, x, y = a
+            base = [rx, ry, rot, int(large), int(sweep)]
+            emit(*shortest([("A", base + [x, y]), ("a", base + [q(x - cx), q(y - cy)])]))
+            cx, cy, last = x, y, None
+    return "".join(out)
+
+
+# --- Transforms ---
+
+def parse_transform(text):
+    """Transform list -> one affine matrix (a, b, c, d, e, f). Raises ValueError."""
+    m = IDENTITY
+    text = (text or "").strip()
+    pos = 0
+    for match in _TRANSFORM_RE.finditer(text):
+        if text[pos:match.start()].strip(" ,"):
+            raise ValueError(f"bad transform {text!r}")
+        pos = match.end()
+        name = match.group(1)
+        v = [float(s) for s in _NUM_RE.findall(match.group(2))]
+        if name == "matrix" and len(v) == 6:
+            t = tuple(v)
+        elif name == "translate" and len(v) in (1, 2):
+            t = (1, 0, 0, 1, v[0], v[1] if len(v) == 2 else 0)
+        elif name == "scale" and len(v) in (1, 2):
+            t = (v[0], 0, 0, v[1] if len(v) == 2 else v[0], 0, 0)
+        elif name == "rotate" and len(v) in (1, 3):
+            r = math.radians(v[0])
+            t = (math.cos(r), math.sin(r), -math.sin(r), math.cos(r), 0, 0)
+            if len(v) == 3:
+                t = mul(mul((1, 0, 0, 1, v[1], v[2]), t), (1, 0, 0, 1, -v[1], -v[2]))
+        elif name == "skewX" and len(v) == 1:
+            t = (1, 0, math.tan(math.radians(v[0])), 1, 0, 0)
+        elif name == "skewY" and len(v) == 1:
+            t = (1, math.tan(math.radians(v[0])), 0, 1, 0, 0)
+        else:
+            raise ValueError(f"bad transform {match.group()!r}")
+        m = mul(m, t)
+    if text[pos:].strip(" ,"):
+        raise ValueError(f"bad transform {text!r}")
+    return m
+
+
+def mul(m, n):
+    """Matrix product m * n (n applied first)"""
+    a, b, c, d, e, f = m
+    return (a * n[0] + c * n[1], b * n[0] + d * n[1],
+            a * n[2] + c * n[3], b * n[2] + d * n[3],
+            a * n[4] + c * n[5] + e, b * n[4] + d * n[5] + f)
+
+
+def apply(m, x, y):
+    return m[0] * x + m[2] * y + m[4], m[1] * x + m[3] * y + m[5]
+
+
+def similarity(m, eps=1e-9):
+    """Uniform scale of a rotation/reflection + scale + translate matrix, else None"""
+    a, b, c, d = m[:4]
+    if (abs(a - d) < eps and abs(b + c) < eps) or (abs(a + d) < eps and abs(b - c) < eps):
+        return math.hypot(a, b)
+    return None
+
+
+def stretch(m):
+    """Largest factor by which m scales any length (top singular value)"""
+    a, b, c, d = m[:4]
+    s, det = a * a + b * b + c * c + d * d, a * d - b * c
+    return math.sqrt((s + math.sqrt(max(0.0, s * s - 4 * det * det))) / 2)
+
+
+def _is_identity(m, eps=1e-12):
+    return all(abs(v - w) < eps for v, w in zip(m, IDENTITY))
+
+
+def format_transform(m, precision):
+    f = lambda v: fmt(v, max(precision, 4))
+    if _is_identity(m[:4] + (0, 0)):
+        return f"translate({_join([f(m[4]), f(m[5])])})"
+    if m[1] == m[2] == m[4] == m[5] == 0:
+        return f"scale({_join([f(m[0])] if m[0] == m[3] else [f(m[0]), f(m[3])])})"
+    return f"matrix({_join([f(v) for v in m])})"
+
+
+def transform_segs(segs, m):
+    """Apply m to absolute segments; None when an arc meets a non-similarity"""
+    s = similarity(m)
+    out = []
+    for cmd, args in segs:
+        if cmd == "A":
+            if s is None:
+                return None
+            rx, ry, rot, large, sweep, x, y = args
+            # New axis angle: the linear part applied to the old axis direction
+            r = math.radians(rot)
+            ax, ay = m[0] * math.cos(r) + m[2] * math.sin(r), m[1] * math.cos(r) + m[3] * math.sin(r)
+            det = m[0] * m[3] - m[1] * m[2]
+            out.append(("A", [rx * s, ry * s, math.degrees(math.atan2(ay, ax)) % 360,
+                              large, sweep if det > 0 else 1 - sweep, *apply(m, x, y)]))
+        else:
+            pts = []
+            for i in range(0, len(args), 2):
+                pts += apply(m, args[i], args[i + 1])
+            out.append((cmd, pts))
+    return out
+
+
+# --- Simplification ---
+
+def _seg_dist(px, py, ax, ay, bx, by):
+    """Distance from a point to segment AB"""
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+    t = 0.0 if not length else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def rdp(points, tolerance):
+    """Ramer-Douglas-Peucker: drop points within tolerance of the kept polyline"""
+    if len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        (ax, ay), (bx, by) = points[lo], points[hi]
+        worst, index = -1.0, None
+        for i in range(lo + 1, hi):
+            dist = _seg_dist(*points[i], ax, ay, bx, by)
+            if dist > worst:
+                worst, index = dist, i
+        if index is not None and worst > tolerance:
+            keep[index] = True
+            stack += [(lo, index), (index, hi)]
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _cubic(p0, p1, p2, p3, t):
+    import numpy as np
+    t = np.asarray(t)[:, None]
+    mt = 1 - t
+    return mt ** 3 * p0 + 3 * mt ** 2 * t * p1 + 3 * mt * t ** 2 * p2 + t ** 3 * p3
+
+
+def _polyline_dist(points, poly):
+    """Distance from each point (N,2) to a polyline (M,2)"""
+    import numpy as np
+    a, b = poly[:-1], poly[1:]
+    ab = b - a
+    length = np.maximum((ab ** 2).sum(1), 1e-18)
+    ap = points[:, None, :] - a[None]
+    t = np.clip((ap * ab[None]).sum(2) / length, 0, 1)
+    near = a[None] + t[..., None] * ab[None]
+    return np.sqrt(((points[:, None, :] - near) ** 2).sum(2)).min(1)
+
+
+def _unit(v):
+    import numpy as np
+    n = np.hypot(*v)
+    return v / n if n > 1e-12 else None
+
+
+def fit_cubics(pieces, tolerance):
+    """
+    Refit consecutive cubics [(p0, c1, c2, p3)] (numpy points) into one cubic
+    with the same end points and end tangents (Schneider least squares +
+    Newton reparameterization). None if the fit strays beyond tolerance.
+    """
+    import numpy as np
+
+    p0, p3 = pieces[0][0], pieces[-1][3]
+    t1 = _unit(pieces[0][1] - p0)
+    if t1 is None:
+        t1 = _unit(pieces[0][2] - p0)
+    t2 = _unit(pieces[-1][2] - p3)
+    if t2 is None:
+        t2 = _unit(pieces[-1][1] - p3)
+    if t1 is None or t2 is None:
+        return None
+
+    ts = np.linspace(0, 1, CURVE_SAMPLES + 1)
+    points = np.concatenate([_cubic(*p, ts if i == 0 else ts[1:]) for i, p in enumerate(pieces)])
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    if steps.sum() <= 0:
+        return None
+    u = np.concatenate([[0.0], np.cumsum(steps)]) / steps.sum()
+
+    fitted = None
+    for _ in range(FIT_ITERATIONS + 1):
+        b1, b2 = 3 * u * (1 - u) ** 2, 3 * u ** 2 * (1 - u)
+        a1, a2 = b1[:, None] * t1, b2[:, None] * t2
+        base = np.outer((1 - u) ** 3 + b1, p0) + np.outer(b2 + u ** 3, p3)
+        rest = points - base
+        c00, c01, c11 = (a1 * a1).sum(), (a1 * a2).sum(), (a2 * a2).sum()
+        x0, x1 = (a1 * rest).sum(), (a2 * rest).sum()
+        det = c00 * c11 - c01 * c01
+        if abs(det) < 1e-12:
+            return None
+        alpha1, alpha2 = (x0 * c11 - x1 * c01) / det, (c00 * x1 - c01 * x0) / det
+        if alpha1 <= 0 or alpha2 <= 0:
+            return None
+        fitted = (p0, p0 + alpha1 * t1, p3 + alpha2 * t2, p3)
+
+        # Newton step: move each u to the closest point of the fitted curve
+        q0, q1, q2, q3 = fitted
+        mu = (1 - u)[:, None]
+        uu = u[:, None]
+        q = _cubic(*fitted, u)
+        d1 = 3 * (mu ** 2 * (q1 - q0) + 2 * mu * uu * (q2 - q1) + uu ** 2 * (q3 - q2))
+        d2 = 6 * (mu * (q2 - 2 * q1 + q0) + uu * (q3 - 2 * q2 + q1))
+        num = ((q - points) * d1).sum(1)
+        den = (d1 * d1).sum(1) + ((q - points) * d2).sum(1)
+        u = np.clip(u - np.divide(num, den, out=np.zeros_like(num), where=np.abs(den) > 1e-12), 0, 1)
+
+    # Symmetric check: original within tolerance of the fit and vice versa
+    dense = _cubic(*fitted, np.linspace(0, 1, 8 * CURVE_SAMPLES * len(pieces) + 1))
+    if _polyline_dist(points, dense).max() > tolerance:
+        return None
+    if _polyline_dist(dense, points).max() > tolerance:
+        return None
+    return fitted
+
+
+def _smooth(prev_c2, joint, next_c1):
+    """True when the tangents on both sides of a joint line up"""
+    v1 = (joint[0] - prev_c2[0], joint[1] - prev_c2[1])
+    v2 = (next_c1[0] - joint[0], next_c1[1] - joint[1])
+    n1, n2 = math.hypot(*v1), math.hypot(*v2)
+    if n1 < 1e-12 or n2 < 1e-12:
+        return False
+    cross = (v1[0] * v2[1] - v1[1] * v2[0]) / (n1 * n2)
+    dot = v1[0] * v2[0] + v1[1] * v2[1]
+    return dot > 0 and abs(cross) <= SMOOTH_JOINT
+
+
+def _walk(segs):
+    """Yield (current point, cmd, args) for absolute segments"""
+    cur = start = (0.0, 0.0)
+    for cmd, args in segs:
+        yield cur, cmd, args
+        if cmd == "M":
+            start = tuple(args)
+        cur = start if cmd == "Z" else _endpoint((cmd, args))
+
+
+def _merge_cubics(segs, tolerance):
+    """Refit runs of smoothly joined cubics into as few cubics as the tolerance allows"""
+    import numpy as np
+
+    out, pieces = [], []
+    for cur, cmd, args in _walk(segs):
+        if cmd != "C":
+            out.append((cmd, args))
+            pieces = []
+            continue
+        piece = np.array([cur, args[0:2], args[2:4], args[4:6]], dtype=float)
+        fit = None
+        if pieces and _smooth(pieces[-1][2], pieces[-1][3], piece[1]):
+            fit = fit_cubics(pieces + [piece], tolerance)
+        if fit is not None:
+            out[-1] = ("C", [float(v) for v in np.array(fit[1:]).ravel()])
+            pieces.append(piece)
+        else:
+            out.append((cmd, args))
+            pieces = [piece]
+    return out
+
+
+def _straighten(segs, tolerance):
+    """Near-straight curves -> lines; drop zero-length lines (lone dots stay)"""
+    out = []
+    for i, (cur, cmd, args) in enumerate(_walk(segs)):
+        if cmd in ("C", "Q"):
+            end = tuple(args[-2:])
+            ctrls = [tuple(args[j:j + 2]) for j in range(0, len(args) - 2, 2)]
+            if all(_seg_dist(*c, *cur, *end) <= tolerance for c in ctrls):
+                cmd, args = "L", list(end)
+        if cmd == "L" and tuple(args) == cur:
+            lone = out and out[-1][0] == "M" and (i + 1 == len(segs) or segs[i + 1][0] in "MZ")
+            if not lone:
+                continue
+        out.append((cmd, args))
+    return out
+
+
+def _reduce_lines(segs, tolerance):
+    """Ramer-Douglas-Peucker over every run of consecutive lines"""
+    out, run = [], []
+    for cur, cmd, args in _walk(segs) if segs else ():
+        if cmd == "L":
+            run = run or [cur]
+            run.append(tuple(args))
+            continue
+        if run:
+            out += [("L", list(p)) for p in rdp(run, tolerance)[1:]]
+            run = []
+        out.append((cmd, args))
+    if run:
+        out += [("L", list(p)) for p in rdp(run, tolerance)[1:]]
+    return out
+
+
+def simplify_path(segs, tolerance):
+    """Error-bounded simplification of absolute segments (see module docstring)"""
+    segs = _merge_cubics(segs, tolerance)
+    segs = _straighten(segs, tolerance)
+    return _reduce_lines(segs, tolerance)
+
+
+def _parse_points(text):
+    v = [float(s) for s in _NUM_RE.findall(text or "")]
+    return [(v[i], v[i + 1]) for i in range(0, len(v) - 1, 2)]
+
+
+def _path_nodes(root):
+    """Path segments + polygon/polyline points in a tree"""
+    count = 0
+    for el in root.iter():
+        tag = _local(el.tag)
+        try:
+            if tag == "path":
+                count += len(parse_path(el.get("d", "")))
+            elif tag in ("polygon", "polyline"):
+                count += len(_parse_points(el.get("points")))
+        except ValueError:
+            pass
+    return count
+
+
+# --- Tree Rewriting ---
+
+def _style(el):
+    decls = {}
+    for item in (el.get("style") or "").split(";"):
+        if ":" in item:
+            k, v = item.split(":", 1)
+            decls[k.strip()] = v.strip()
+    return decls
+
+
+def _style_to_attrs(el):
+    """Inline style -> presentation attributes (only without <style> sheets)"""
+    decls = _style(el)
+    if decls and all(k in PRESENTATION for k in decls):
+        del el.attrib["style"]
+        for k, v in decls.items():
+            el.set(k, v)
+
+
+def _strip(el):
+    for key in list(el.attrib):
+        ns = key[1:].split("}")[0] if key.startswith("{") else ""
+        if any(e in ns for e in EDITOR_NS) or (key == "opacity" and _num(el.get(key)) == 1):
+            del el.attrib[key]
+
+
+def _collapsible(g):
+    if not len(g) or any(_local(k.tag) not in GRAPHICS for k in g):
+        return False
+    for key in g.attrib:
+        if key == "opacity":
+            if len(g) != 1:
+                return False    # Group opacity != per-child opacity where children overlap
+        elif key != "transform" and key not in INHERITED:
+            return False        # id, class, style, clip-path, filter, ...
+    return True
+
+
+def _splice(parent, index, g):
+    """
+    Replace g by its children, pushing attributes down. Every child's new
+    transform / opacity is computed first: on ValueError the tree is untouched.
+    """
+    m = parse_transform(g.get("transform"))
+    opacity = _num(g.get("opacity", "1"))
+    if opacity is None:
+        raise ValueError(f"bad opacity {g.get('opacity')!r}")
+    kids = list(g)
+    updates = []
+    for kid in kids:
+        new = {}
+        if "transform" in g.attrib:
+            new["transform"] = format_transform(mul(m, parse_transform(kid.get("transform"))), 6)
+        if "opacity" in g.attrib:
+            # Inline style wins over the attribute, so fold into whichever applies
+            decls = _style(kid)
+            own = _num(decls.get("opacity", kid.get("opacity", "1")))
+            if own is None:
+                raise ValueError(f"bad opacity on {_local(kid.tag)}")
+            if "opacity" in decls:
+                decls["opacity"] = repr(opacity * own)
+                new["style"] = ";".join(f"{k}:{v}" for k, v in decls.items())
+            else:
+                new["opacity"] = repr(opacity * own)
+        updates.append(new)
+
+    parent.remove(g)
+    for j, (kid, new) in enumerate(zip(kids, updates)):
+        for key, value in g.attrib.items():
+            if key not in ("transform", "opacity"):
+                kid.attrib.setdefault(key, value)
+        kid.attrib.update(new)
+        parent.insert(index + j, kid)
+
+
+def _bake(el, m, eff, css=False):
+    """Apply m to el's geometry in place; False when that would not be exact"""
+    tag = _local(el.tag)
+    if _is_identity(m):
+        return True
+    if css:
+        return False    # Stylesheet paint/stroke rules are invisible to us
+    if any(k in el.attrib for k in ("clip-path", "mask", "filter")):
+        return False
+    if any(eff.get(k, "").startswith("url(") for k in ("fill", "stroke")):
+        return False    # userSpaceOnUse paint servers live in the old space
+
+    s = similarity(m)
+    stroked = eff.get("stroke", "none") not in ("none", "transparent")
+    width = None
+    if stroked:
+        width = _num(eff.get("stroke-width", "1"))
+        dashed = eff.get("stroke-dasharray", "none") != "none"
+        if s is None or width is None or (dashed and abs(s - 1) > 1e-9):
+            return False
+
+    if tag == "path":
+        segs = transform_segs(parse_path(el.get("d", "")), m)
+        if segs is None:
+            return False
+        el.set("d", serialize_path(segs, 6))
+    elif tag in ("polygon", "polyline"):
+        pts = [apply(m, *p) for p in _parse_points(el.get("points"))]
+        el.set("points", " ".join(f"{x!r},{y!r}" for x, y in pts))
+    elif tag == "line":
+        vals = [_num(el.get(k, "0")) for k in ("x1", "y1", "x2", "y2")]
+        if None in vals:
+            return False
+        for keys, p in ((("x1", "y1"), vals[:2]), (("x2", "y2"), vals[2:])):
+            for k, v in zip(keys, apply(m, *p)):
+                el.set(k, repr(v))
+    elif tag in ("circle", "ellipse", "rect"):
+        axis_aligned = abs(m[1]) < 1e-9 and abs(m[2]) < 1e-9 and m[0] > 0 and abs(m[0] - m[3]) < 1e-9
+        if s is None or (tag != "circle" and not axis_aligned):
+            return False
+        keys = {"circle": ("cx", "cy", "r"), "ellipse": ("cx", "cy", "rx", "ry"),
+                "rect": ("x", "y", "width", "height", "rx", "ry")}[tag]
+        vals = {k: _num(el.get(k, "0")) for k in keys if k in el.attrib or k in ("x", "y", "cx", "cy")}
+        if None in vals.values():
+            return False
+        px, py = ("cx", "cy") if tag != "rect" else ("x", "y")
+        x, y = apply(m, vals[px], vals[py])
+        el.set(px, repr(x))
+        el.set(py, repr(y))
+        for k in keys[2:]:
+            if k in vals:
+                el.set(k, repr(vals[k] * s))
+    else:
+        return False
+
+    if stroked and abs(s - 1) > 1e-9:
+        el.set("stroke-width", repr(width * s))
+    return True
+
+
+def _finish_shape(el, precision, tolerance):
+    """Simplify + quantize one shape's geometry"""
+    tag = _local(el.tag)
+    if tag == "path":
+        try:
+            segs = parse_path(el.get("d", ""))
+        except ValueError:
+            return
+        el.set("d", serialize_path(simplify_path(segs, tolerance), precision))
+    elif tag in ("polygon", "polyline"):
+        pts = _parse_points(el.get("points"))
+        if tag == "polygon" and len(pts) > 2:
+            pts = rdp(pts + [pts[0]], tolerance)[:-1]
+        else:
+            pts = rdp(pts, tolerance)
+        el.set("points", _join([fmt(v, precision) for p in pts for v in p]))
+    for k in GEOMETRY:
+        v = _num(el.get(k)) if k in el.attrib else None
+        if v is not None:
+            el.set(k, fmt(v, precision))
+
+
+def _local_opts(opts, m):
+    """
+    Precision / tolerance for geometry drawn through m: a tolerance in the
+    viewBox's units shrinks by m's stretch, and each 10x gains a decimal.
+    """
+    k = stretch(m)
+    if not k:
+        return dict(opts, exact=True)    # Degenerate: nothing to measure against
+    if abs(k - 1) < 1e-9:
+        return opts
+    return dict(opts, tolerance=opts["tolerance"] / k,
+                precision=opts["precision"] + max(0, math.ceil(math.log10(k))))
+
+
+def _rewrite(parent, inherited, opts):
+    i = 0
+    while i < len(parent):
+        el = parent[i]
+        tag = _local(el.tag)
+        if not isinstance(el.tag, str) or tag in DROP_TAGS or any(e in el.tag for e in EDITOR_NS):
+            parent.remove(el)
+            continue
+        _strip(el)
+        if not opts["css"]:
+            _style_to_attrs(el)
+        if tag == "g" and _collapsible(el):
+            try:
+                _splice(parent, i, el)
+                continue    # Re-examine the spliced children at this index
+            except ValueError:
+                pass        # Unparseable transform/opacity: keep the group
+
+        eff = dict(inherited)
+        eff.update({k: v for k, v in el.attrib.items() if k in INHERITED})
+        if not opts["css"]:
+            eff.update({k: v for k, v in _style(el).items() if k in INHERITED})
+        if tag in SHAPES:
+            local = opts
+            try:
+                m = parse_transform(el.get("transform"))
+                if _bake(el, m, eff, opts["css"]):
+                    el.attrib.pop("transform", None)
+                else:
+                    local = _local_opts(opts, m)
+                    if "transform" in el.attrib and not opts["exact"]:
+                        short = format_transform(m, opts["precision"])
+                        if len(short) < len(el.get("transform")):
+                            el.set("transform", short)
+            except ValueError:
+                local = dict(opts, exact=True)
+            if not local["exact"]:
+                _finish_shape(el, local["precision"], local["tolerance"])
+        if tag in CONTAINERS:
+            if tag in FOREIGN_SPACES:
+                scoped = dict(opts, exact=True)
+            else:
+                try:
+                    scoped = _local_opts(opts, parse_transform(el.get("transform")))
+                except ValueError:
+                    scoped = dict(opts, exact=True)
+            _rewrite(el, eff, scoped)
+            if tag == "g" and not len(el) and "id" not in el.attrib:
+                parent.remove(el)
+                continue
+        i += 1
+
+
+def _strip_whitespace(el):
+    if _local(el.tag) in ("text", "tspan", "textPath", "style"):
+        return
+    if el.text and not el.text.strip():
+        el.text = None
+    for kid in el:
+        if kid.tail and not kid.tail.strip():
+            kid.tail = None
+        _strip_whitespace(kid)
+
+
+def view_box(root):
+    """(x, y, w, h) from viewBox, else width/height, else 512x512"""
+    vb = [float(v) for v in _NUM_RE.findall(root.get("viewBox", ""))]
+    if len(vb) == 4 and vb[2] > 0 and vb[3] > 0:
+        return tuple(vb)
+    w, h = _num(root.get("width")), _num(root.get("height"))
+    return (0.0, 0.0, w or 512.0, h or 512.0)
+
+
+def optimize_svg(text, precision=None, tolerance=None):
+    """
+    Optimize SVG source text. Returns (optimized_text, stats) with
+    bytes / elements / path_nodes as (before, after) pairs.
+    Raises xml.etree.ElementTree.ParseError on malformed input.
+    """
+    ET.register_namespace("", SVG_NS)
+    ET.register_namespace("xlink", XLINK_NS)
+    root = ET.fromstring(text)
+
+    extent = max(view_box(root)[2:])
+    if precision is None:
+        precision = max(0, 3 - math.floor(math.log10(extent)))
+    if tolerance is None:
+        tolerance = extent * TOLERANCE_FRACTION
+
+    before = (len(text.encode()), sum(1 for _ in root.iter()), _path_nodes(root))
+    css = any(_local(el.tag) == "style" for el in root.iter())
+    _strip(root)
+    _strip_whitespace(root)
+    inherited = {k: v for k, v in root.attrib.items() if k in INHERITED}
+    if not css:
+        inherited.update({k: v for k, v in _style(root).items() if k in INHERITED})
+    _rewrite(root, inherited, {"css": css, "precision": precision, "tolerance": tolerance,
+                               "exact": False})
+    out = ET.tostring(root, encoding="unicode").replace(" />", "/>")
+    after = (len(out.encode()), sum(1 for _ in root.iter()), _path_nodes(root))
+
+    stats = {k: (b, a) for k, b, a in zip(("bytes", "elements", "path_nodes"), before, after)}
+    stats.update(precision=precision, tolerance=tolerance)
+    return out, stats
+
+
+# --- Equivalence Check ---
+
+def _arc_points(x1, y1, rx, ry, phi, large, sweep, x2, y2):
+    """Flatten an endpoint-parameterized arc (SVG spec F.6.5)"""
+    if (x1, y1) == (x2, y2):
+        return []
+    rx, ry = abs(rx), abs(ry)
+    if not rx or not ry:
+        return [(x2, y2)]
+    cp, sp = math.cos(math.radians(phi)), math.sin(math.radians(phi))
+    dx, dy = (x1 - x2) / 2, (y1 - y2) / 2
+    x1p, y1p = cp * dx + sp * dy, -sp * dx + cp * dy
+    lam = (x1p / rx) ** 2 + (y1p / ry) ** 2
+    if lam > 1:
+        rx, ry = rx * math.sqrt(lam), ry * math.sqrt(lam)
+    num = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    den = rx * rx * y1p * y1p + ry * ry * x1p * x1p
+    k = math.sqrt(max(0.0, num / den)) if den else 0.0
+    if large == sweep:
+        k = -k
+    cxp, cyp = k * rx * y1p / ry, -k * ry * x1p / rx
+    cx = cp * cxp - sp * cyp + (x1 + x2) / 2
+    cy = sp * cxp + cp * cyp + (y1 + y2) / 2
+    a1 = math.atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    a2 = math.atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx)
+    delta = a2 - a1
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+    steps = max(4, int(abs(delta) * 16 / math.pi))
+    pts = []
+    for i in range(1, steps + 1):
+        a = a1 + delta * i / steps
+        ex, ey = rx * math.cos(a), ry * math.sin(a)
+        pts.append((cp * ex - sp * ey + cx, sp * ex + cp * ey + cy))
+    return pts
+
+
+def _flatten(el):
+    """Shape -> [(points, closed)] in user space"""
+    tag = _local(el.tag)
+    g = lambda k: _num(el.get(k, "0")) or 0.0
+    if tag == "rect":
+        x, y, w, h = g("x"), g("y"), g("width"), g("height")
+        return [([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], True)]
+    if tag in ("circle", "ellipse"):
+        rx = g("r") if tag == "circle" else g("rx")
+        ry = g("r") if tag == "circle" else g("ry")
+        pts = [(g("cx") + rx * math.cos(a), g("cy") + ry * math.sin(a))
+               for a in (2 * math.pi * i / 64 for i in range(64))]
+        return [(pts, True)]
+    if tag == "line":
+        return [([(g("x1"), g("y1")), (g("x2"), g("y2"))], False)]
+    if tag in ("polygon", "polyline"):
+        return [(_parse_points(el.get("points")), tag == "polygon")]
+    if tag != "path":
+        return []
+
+    subpaths, pts, cur, start = [], [], (0.0, 0.0), (0.0, 0.0)
+    for cmd, a in parse_path(el.get("d", "")):
+        if cmd == "M":
+            if len(pts) > 1:
+                subpaths.append((pts, False))
+            cur = start = (a[0], a[1])
+            pts = [cur]
+            continue
+        if cmd == "Z":
+            if len(pts) > 1:
+                subpaths.append((pts, True))
+            cur = start
+            pts = [cur]
+            continue
+        if cmd == "L":
+            pts.append((a[0], a[1]))
+        elif cmd == "C":
+            for i in range(1, 17):
+                t = i / 16
+                mt = 1 - t
+                pts.append(tuple(mt ** 3 * p0 + 3 * mt * mt * t * p1 + 3 * mt * t * t * p2 + t ** 3 * p3
+                                 for p0, p1, p2, p3 in zip(cur, a[0:2], a[2:4], a[4:6])))
+        elif cmd == "Q":
+            for i in range(1, 13):
+                t = i / 12
+                mt = 1 - t
+                pts.append(tuple(mt * mt * p0 + 2 * mt * t * p1 + t * t * p2
+                                 for p0, p1, p2 in zip(cur, a[0:2], a[2:4])))
+        else:
+            pts += _arc_points(*cur, *a)
+        cur = (a[-2], a[-1])
+    if len(pts) > 1:
+        subpaths.append((pts, False))
+    return subpaths
+
+
+def _paint(value):
+    from PIL import ImageColor
+    if value in (None, "none", "transparent"):
+        return None
+    if value.startswith("url("):
+        return (128, 128, 128)    # Gradients/patterns: flat stand-in on both sides
+    if value == "currentColor":
+        return (0, 0, 0)
+    try:
+        return ImageColor.getrgb(value)[:3]
+    except ValueError:
+        return (0, 0, 0)
+
+
+def rasterize(text, size=RASTER_SIZE):
+    """
+    Minimal SVG rasterizer for before/after checks: shapes and paths with
+    fill, stroke, opacity, transforms and fill-rule. Text, images, filters
+    and CSS sheets are ignored identically on both sides; anything in
+    UNDRAWN is skipped, which is why visual_check() refuses it.
+    """
+    from PIL import Image, ImageChops, ImageDraw
+
+    root = ET.fromstring(text)
+    vx, vy, vw, vh = view_box(root)
+    scale = size / max(vw, vh)
+    ss = SUPERSAMPLE
+    canvas_size = (max(1, round(vw * scale)) * ss, max(1, round(vh * scale)) * ss)
+    canvas = Image.new("RGBA", canvas_size, (0, 0, 0, 0))
+    base = (scale * ss, 0, 0, scale * ss, -vx * scale * ss, -vy * scale * ss)
+
+    def draw(el, ctx, m, opacity):
+        tag = _local(el.tag)
+        props = dict(ctx)
+        props.update({k: v for k, v in el.attrib.items() if k in PRESENTATION})
+        props.update({k: v for k, v in _style(el).items() if k in PRESENTATION})
+        if props.get("display") == "none" or tag in ("defs", "clipPath", "mask", "symbol",
+                                                      "pattern", "marker", "style"):
+            return
+        try:
+            m = mul(m, parse_transform(el.get("transform")))
+        except ValueError:
+            pass
+        opacity *= float(_num(props.pop("opacity", "1")) or 0)
+        if tag in SHAPES:
+            try:
+                shapes = [([apply(m, *p) for p in pts], closed) for pts, closed in _flatten(el)]
+            except ValueError:
+                shapes = []
+            fill = _paint(props.get("fill", "black"))
+            if fill and shapes:
+                mask = Image.new("1", canvas_size, 0)
+                for pts, _ in shapes:
+                    if len(pts) < 3:
+                        continue
+                    layer = Image.new("1", canvas_size, 0)
+                    ImageDraw.Draw(layer).polygon(pts, fill=1)
+                    if props.get("fill-rule") == "evenodd":
+                        mask = ImageChops.logical_xor(mask, layer)
+                    else:
+                        mask = ImageChops.logical_or(mask, layer)
+                alpha = opacity * float(_num(props.get("fill-opacity", "1")) or 0)
+                _composite(canvas, mask, fill, alpha)
+            stroke = _paint(props.get("stroke"))
+            width = (_num(props.get("stroke-width", "1")) or 0) * math.sqrt(abs(m[0] * m[3] - m[1] * m[2]))
+            if stroke and shapes and width > 0:
+                mask = Image.new("L", canvas_size, 0)
+                d = ImageDraw.Draw(mask)
+                for pts, closed in shapes:
+                    d.line(pts + pts[:1] if closed else pts, fill=255,
+                           width=max(1, round(width)), joint="curve")
+                alpha = opacity * float(_num(props.get("stroke-opacity", "1")) or 0)
+                _composite(canvas, mask, stroke, alpha)
+        for kid in el:
+            inherited = {k: v for k, v in props.items() if k in INHERITED}
+            draw(kid, inherited, m, opacity)
+
+    draw(root, {}, base, 1.0)
+    return canvas.resize((canvas_size[0] // ss, canvas_size[1] // ss), Image.Resampling.BOX)
+
+
+def _composite(canvas, mask, color, alpha):
+    from PIL import Image
+    layer = Image.new("RGBA", canvas.size, color + (0,))
+    layer.putalpha(mask.convert("L").point(lambda v: round(v * max(0.0, min(1.0, alpha)))))
+    canvas.alpha_composite(layer)
+
+
+def undrawn(text):
+    """First element rasterize() would skip that carries geometry, else None"""
+    root = ET.fromstring(text)
+    for parent in root.iter():
+        for el in parent:
+            tag = _local(el.tag)
+            if tag in UNDRAWN:
+                return tag
+            if _local(parent.tag) == "defs" and tag in GRAPHICS:
+                return "defs"
+    return None
+
+
+def visual_check(before, after, size=RASTER_SIZE):
+    """
+    Rasterize both SVGs and compare (diff_catalog metrics); returns metrics
+    dict. Fails closed when either side has content rasterize() cannot draw.
+    """
+    import numpy as np
+    from diff_catalog import ssim
+
+    for text in (before, after):
+        tag = undrawn(text)
+        if tag:
+            return {"passed": False, "mean_error": None, "ssim": None, "undrawn": tag}
+
+    arrays = []
+    for text in (before, after):
+        arr = np.asarray(rasterize(text, size), dtype=np.float64)
+        arr[..., :3] *= arr[..., 3:4] / 255.0
+        arrays.append(arr)
+    a, b = arrays
+    if a.shape != b.shape:
+        return {"passed": False, "mean_error": None, "ssim": None}
+    diff = np.abs(a - b)
+    changed = diff.max(axis=2) > 0
+    metrics = {"mean_error": float(diff.mean()), "ssim": ssim(a, b, changed)}
+    metrics["passed"] = metrics["mean_error"] <= MAX_MEAN_ERROR and metrics["ssim"] >= MIN_SSIM
+    return metrics
+
+
+def optimize_file(path, out_path=None, precision=None, tolerance=None, check=True):
+    """
+    Optimize one SVG file in place (or into out_path). The original is kept
+    when the equivalence check fails. Returns the stats dict or None.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    try:
+        out, stats = optimize_svg(text, precision, tolerance)
+    except ET.ParseError as e:
+        print(f"❌ {path}: not valid SVG ({e})")
+        return None
+
+    if check:
+        stats["check"] = visual_check(text, out)
+        if stats["check"].get("undrawn"):
+            print(f"❌ {path}: <{stats['check']['undrawn']}> cannot be checked by the built-in "
+                  f"rasterizer, kept original (--no-check to optimize anyway)")
+            return stats
+        if not stats["check"]["passed"]:
+            print(f"❌ {path}: optimized render differs (mean error "
+                  f"{stats['check']['mean_error']}, ssim {stats['check']['ssim']}), kept original")
+            return stats
+
+    with open(out_path or path, "w", encoding="utf-8") as f:
+        f.write(out)
+    (b0, b1), (e0, e1), (n0, n1) = stats["bytes"], stats["elements"], stats["path_nodes"]
+    check_note = (f", ssim {stats['check']['ssim']:.4f}" if check else "")
+    print(f"✅ {out_path or path}: {b0} -> {b1} bytes ({100 * (1 - b1 / max(b0, 1)):.0f}% smaller), "
+          f"elements {e0} -> {e1}, path nodes {n0} -> {n1}{check_note}")
+    return stats
+
+
+def main(paths, precision=None, tolerance=None, check=True):
+    failed = 0
+    for path in paths:
+        stats = optimize_file(path, precision=precision, tolerance=tolerance, check=check)
+        if stats is None or (check and not stats["check"]["passed"]):
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Shivering Ghosts - Texture Memory Budget
+A PNG's size on disk says nothing about what it costs once SpriteKit
+decodes it: every texture becomes 4 bytes/pixel (RGBA8) with its rows
+padded to the GPU's alignment, and atlases / older GPUs pad both
+dimensions to a power of two (--pot).
+
+This reads every imageset (Contents.json + image headers, no decoding),
+computes the decoded size per device scale, sums it per gameplay scene
+from a declarative manifest (texture_scenes.json) and fails when a scene
+exceeds its budget.
+
+Manifest entries are imageset names or fnmatch patterns:
+    "heart"                    one texture
+    "powerup_*"                every match is resident at once
+    {"max_of": "ghost_*"}      only one of these is on screen (largest counts)
+Patterns skip names matching the manifest's "exclude" list (e.g. the
+"*_sdf" variants sdf_export adds next to the bitmap they replace);
+exact names always count.
+Budgets are MB, either one number or per scale: {"2x": 12, "3x": 24}.
+"""
+
+import fnmatch
+import json
+import os
+
+ASSETS_DIR = "Shivering Ghosts/Assets.xcassets"
+SCENES_MANIFEST = "texture_scenes.json"
+
+BYTES_PER_PIXEL = 4     # RGBA8 once decoded
+ROW_ALIGNMENT = 64      # Metal texture row pitch alignment (bytes)
+SCALES = ("1x", "2x", "3x")
+MB = 1024 * 1024
+
+
+def next_pow2(n):
+    return 1 << max(0, n - 1).bit_length()
+
+
+def texture_bytes(width, height, pot=False):
+    """Decoded GPU size of one texture"""
+    if pot:
+        # Older GPUs / atlases pad both dimensions to powers of two
+        width, height = next_pow2(width), next_pow2(height)
+    row = width * BYTES_PER_PIXEL
+    row = -(-row // ROW_ALIGNMENT) * ROW_ALIGNMENT
+    return row * height
+
+
+def scan_catalog(catalog_dir=ASSETS_DIR, pot=False):
+    """
+    Map imageset name -> {scale: {"size": [w, h], "bytes": n, "file": path}}.
+    A universal image without a scale (e.g. SDF textures) counts for every scale.
+    """
+    from PIL import Image
+
+    catalog = {}
+    for root, dirs, files in os.walk(catalog_dir):
+        if not root.endswith(".imageset") or "Contents.json" not in files:
+            continue
+        name = os.path.basename(root)[:-len(".imageset")]
+        with open(os.path.join(root, "Contents.json")) as f:
+            contents = json.load(f)
+
+        scales = {}
+        for entry in contents.get("images", []):
+            filename = entry.get("filename")
+            if not filename or not os.path.exists(os.path.join(root, filename)):
+                continue
+            path = os.path.join(root, filename)
+            with Image.open(path) as img:   # Header only, pixels not decoded
+                w, h = img.size
+            info = {"size": [w, h], "bytes": texture_bytes(w, h, pot), "file": path}
+            for scale in ([entry["scale"]] if "scale" in entry else SCALES):
+                scales[scale] = info
+        catalog[name] = scales
+    return catalog
+
+
+def _matches(catalog, pattern, exclude=()):
+    if pattern in catalog:
+        return [pattern]
+    return sorted(n for n in catalog if fnmatch.fnmatchcase(n, pattern)
+                  and not any(fnmatch.fnmatchcase(n, x) for x in exclude))
+
+
+def scene_usage(catalog, entries, scale, exclude=()):
+    """Sum decoded bytes of a scene's entries at one scale; returns (total, rows)"""
+    rows, total = [], 0
+    for entry in entries:
+        if isinstance(entry, dict):
+            names = _matches(catalog, entry["max_of"], exclude)
+            sized = [(catalog[n].get(scale, {}).get("bytes", 0), n) for n in names]
+            picked = [max(sized)] if sized else []
+        else:
+            names = _matches(catalog, entry, exclude)
+            picked = [(catalog[n].get(scale, {}).get("bytes", 0), n) for n in names]
+        if not picked:
+            rows.append((entry, None, 0))
+        for size, name in picked:
+            rows.append((entry, name, size))
+            total += size
+    return total, rows
+
+
+def budget_for(scene, scale):
+    budget = scene.get("budget_mb")
+    if isinstance(budget, dict):
+        budget = budget.get(scale)
+    return None if budget is None else budget * MB
+
+
+def check(manifest, catalog, scales=SCALES, verbose=False):
+    """Print per-scene usage; returns list of (scene, scale, used, budget) over budget"""
+    failures = []
+    exclude = manifest.get("exclude", ())
+    for scene_name, scene in manifest["scenes"].items():
+        for scale in scales:
+            used, rows = scene_usage(catalog, scene["textures"], scale, exclude)
+            budget = budget_for(scene, scale)
+            over = budget is not None and used > budget
+            mark = "❌" if over else "✅"
+            limit = f" / {budget / MB:.1f} MB" if budget is not None else ""
+            print(f"{mark} {scene_name} @{scale}: {used / MB:.2f} MB{limit}")
+            if verbose or over:
+                for entry, name, size in rows:
+                    if name is None:
+                        print(f"     ⚠️  no imageset matches {entry!r}")
+                    else:
+                        print(f"     {size / MB:7.2f} MB  {name}")
+            if over:
+                failures.append((scene_name, scale, used, budget))
+    return failures
+
+
+def main(manifest_path=SCENES_MANIFEST, catalog_dir=ASSETS_DIR, pot=False, verbose=False):
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    catalog = scan_catalog(catalog_dir, pot)
+
+    print(f"🧮 Texture memory ({'power-of-two' if pot else 'exact'} sizes, "
+          f"{BYTES_PER_PIXEL} B/px, {ROW_ALIGNMENT} B row alignment)")
+    failures = check(manifest, catalog, manifest.get("scales", SCALES), verbose)
+    if failures:
+        print(f"❌ {len(failures)} scene/scale combination(s) over budget")
+        return 1
+    print("✅ All scenes within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())